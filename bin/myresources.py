@@ -33,24 +33,69 @@ myrsources script
 from __future__ import division, print_function
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 import sys
-import xml.etree.cElementTree as ET
 
-from vsc.utils.run import asyncloop
+try:
+    import xml.etree.cElementTree as ET  # Python 2
+except ImportError:
+    import xml.etree.ElementTree as ET  # Python 3.9+
 
-from vsc.myresources.constants import VERSION
+from vsc.myresources.api import qstat_source
+from vsc.myresources.archive import ArchiveError, is_archive, write_archive
+from vsc.myresources.batch import (
+    snapshot_files,
+    summarize_files,
+    throughput_string,
+    write_summary,
+    write_summary_csv,
+)
+from vsc.myresources.constants import VERSION, DIFF_THRESHOLD, HISTORY_FILE, PROMETHEUS_INTERVAL, RESLIST
+from vsc.myresources.diff import (
+    diff_csv_string,
+    diff_jobs,
+    diff_string,
+    index_jobs,
+    write_header_diff,
+    write_header_diff_csv,
+)
+from vsc.myresources.exporter import collect_metrics, serve_metrics, write_textfile
+from vsc.myresources.filters import NUMBER_NAMES, OPERATORS, STRING_NAMES, FilterError, JobFilter
+from vsc.myresources.history import (
+    get_recommendation,
+    group_key,
+    load_history,
+    resource_list,
+    save_history,
+    update_history,
+)
+from vsc.myresources.queuestats import collect_queue_stats, write_queue_stats
+from vsc.myresources.resources import RESOURCES
+from vsc.myresources.top import TOP_METRICS, top_jobs
 from vsc.myresources.utils import (
     write_header,
     write_header_csv,
     write_alerts,
     write_string,
     calc_usage,
-    parse_xml,
+    iter_jobs,
+    iter_job_fields,
+    iter_snapshot,
+    match_job,
+    select_jobs,
+    select_owners,
     csv_string,
     usage_string,
     new_job,
+    ENGINES,
+    MyResourcesError,
+    enable_resources,
 )
 
 
+# errors when reading xml files or snapshot archives
+# unsupported job data (MyResourcesError) is not a read error, it ends in 'Error: ...' with exit code 1
+READ_ERRORS = (IOError, ArchiveError, ET.ParseError)
+
+
 def demo_myresources(alerts=True, colors=True):
     write_header()
     for i in range(1, 5):
@@ -71,6 +116,221 @@ def demo_myresources(alerts=True, colors=True):
         print("")
 
 
+def xml_source(infile):
+    """ get the xml file name, or the output of 'qstat -xt' as a file object """
+    if infile:
+        return infile
+    return qstat_source()
+
+
+def get_jobs(infile, jobids=None, states=None, engine="etree", owners=None, filters=None):
+    """
+    iterate over the jobs with calculated resource usage in an xml file or snapshot archive,
+    or in the output of 'qstat -xt'
+    """
+    if infile:
+        return iter_snapshot(infile, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+    # qstat only supports selecting users with the -u option in the alternative output formats, not with -x
+    source = xml_source(infile)
+    return iter_jobs(source, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+
+
+def diff_myresources(
+    oldfile,
+    newfile,
+    jobids=None,
+    states=None,
+    threshold=DIFF_THRESHOLD,
+    as_csv=False,
+    engine="etree",
+    owners=None,
+    filters=None,
+):
+    """
+    show only the jobs that were added, removed or changed between two snapshots
+    the jobs are matched by job ID before selecting them by state and filter, in either snapshot
+    """
+
+    def select(job):
+        return match_job(job, states=states) and (filters is None or filters.match(job))
+
+    try:
+        old_index = index_jobs(get_jobs(oldfile, jobids=jobids, engine=engine, owners=owners))
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % oldfile)
+        sys.exit()
+
+    if as_csv:
+        write_header_diff_csv()
+    else:
+        write_header_diff()
+
+    new_jobs = get_jobs(newfile, jobids=jobids, engine=engine, owners=owners)
+    try:
+        for change, old, new, delta in diff_jobs(old_index, new_jobs, threshold=threshold, select=select):
+            if as_csv:
+                write_string(diff_csv_string(change, old, new, delta))
+            else:
+                # write_string handles write errors, so only read errors reach the handler below
+                write_string(diff_string(change, old, new, delta) + "\n")
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % (newfile or "qstat -xt"))
+        sys.exit()
+
+
+def top_myresources(
+    infile,
+    number,
+    by,
+    jobids=None,
+    states=None,
+    as_csv=False,
+    alerts=True,
+    colors=True,
+    engine="etree",
+    owners=None,
+    filters=None,
+):
+    """ show the jobs wasting the most resources """
+    jobs = get_jobs(infile, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+    try:
+        top = top_jobs(jobs, number, by=by)
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % (infile or "qstat -xt"))
+        sys.exit()
+
+    unit = TOP_METRICS[by][1]
+    column = "wasted_%s" % unit.replace("-", "_")
+    if as_csv:
+        write_header_csv(extra=[column])
+    else:
+        write_header()
+
+    for value, job in top:
+        if as_csv:
+            write_string(csv_string(job, extra=[value]))
+        else:
+            write_string(usage_string(job, colors=colors))
+            print("%12s %10.1f %s" % ("wasted", value, unit))
+            if alerts:
+                write_alerts(job)
+            print("")
+
+
+def recommend_myresources(
+    infile, history_file, jobids=None, states=None, as_csv=False, engine="etree", owners=None, filters=None
+):
+    """
+    add the finished jobs to the history,
+    and show the recommended resources for the groups of similar jobs of the selected jobs
+    """
+    try:
+        history = load_history(history_file)
+    except (IOError, ValueError) as err:
+        print("Error loading history file %s: %s" % (history_file, err))
+        sys.exit()
+
+    try:
+        jobs = list(get_jobs(infile, engine=engine, owners=owners))
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % (infile or "qstat -xt"))
+        sys.exit()
+
+    if update_history(history, jobs):
+        try:
+            save_history(history, history_file)
+        except (IOError, OSError) as err:
+            sys.stderr.write("Warning: could not save history file %s: %s\n" % (history_file, err))
+
+    if as_csv:
+        print("jobname,queue,nodes,njobs,ppn,mem,walltime")
+    else:
+        fstring = "%-30s %-12s %-20s %5s %s"
+        print(fstring % ("jobname", "queue", "nodes", "jobs", "recommended request"))
+        print(fstring % ("-------", "-----", "-----", "----", "-------------------"))
+
+    seen = set()
+    for job in jobs:
+        if not match_job(job, jobids=jobids, states=states) or (filters and not filters.match(job)):
+            continue
+        rec = get_recommendation(history, job)
+        key = group_key(job)
+        if rec is None or key in seen:
+            continue
+        seen.add(key)
+        jobname = history["groups"][key]["jobname"]
+        if as_csv:
+            fields = [jobname, job["queue"], job["nodes"], rec["njobs"], rec["ppn"], rec["mem"], rec["walltime"]]
+            write_string(",".join("" if i is None else str(i) for i in fields))
+        else:
+            request = "-l %s" % resource_list(job, rec)
+            write_string(fstring % (jobname, job["queue"], job["nodes"] or "-", rec["njobs"], request))
+
+
+def export_myresources(
+    infile, textfile_dir=None, port=None, jobids=None, states=None, engine="etree", owners=None, filters=None
+):
+    """ write the metrics to the node_exporter textfile directory, or serve them over http """
+
+    def get_metrics():
+        jobs = get_jobs(infile, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+        return collect_metrics(jobs)
+
+    if textfile_dir:
+        try:
+            write_textfile(get_metrics(), textfile_dir)
+        except READ_ERRORS:
+            print("Error parsing xml file: %s" % (infile or "qstat -xt"))
+            sys.exit()
+        except OSError as err:
+            print("Error writing metrics to %s: %s" % (textfile_dir, err))
+            sys.exit()
+
+    if port:
+        try:
+            serve_metrics(get_metrics, port, interval=PROMETHEUS_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+
+def batch_myresources(
+    path, jobids=None, states=None, as_csv=False, engine="etree", processes=None, owners=None, expression=None
+):
+    """ summarize all snapshot files in a directory or matching a glob pattern """
+    filenames = snapshot_files(path)
+    if not filenames:
+        print("Error: no snapshot files found: %s" % path)
+        sys.exit()
+
+    summary, elapsed = summarize_files(
+        filenames,
+        jobids=jobids,
+        states=states,
+        owners=owners,
+        expression=expression,
+        engine=engine,
+        processes=processes,
+    )
+    if as_csv:
+        write_summary_csv(summary)
+        sys.stderr.write("%s\n" % throughput_string(summary, elapsed))
+        for filename, err in summary["failed"]:
+            sys.stderr.write("failed: %s (%s)\n" % (filename, err))
+    else:
+        write_summary(summary, elapsed)
+
+
+def queues_myresources(infile, jobids=None, states=None, engine="etree", owners=None, filters=None):
+    """ show the wait time per queue, the throughput per hour, and the wait time per usage of finished jobs """
+    try:
+        jobs = get_jobs(infile, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+        stats = collect_queue_stats(jobs)
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % (infile or "qstat -xt"))
+        sys.exit()
+    write_queue_stats(stats)
+
+
 def main():
     """ main function """
 
@@ -96,7 +356,7 @@ Color codes corresponding to ratings:
     parser.add_argument("jobid", help="show only resources for given jobID(s) (default: show all)", nargs="*")
     parser.add_argument(
         "-a", "--noalert", dest="alerts", help="do not show alert messages", action="store_false", default=True)
-    parser.add_argument("-f", "--infile", dest="infile", help="xml file (output of 'qstat -xt')")
+    parser.add_argument("-f", "--infile", dest="infile", help="xml file (output of 'qstat -xt') or snapshot archive")
     parser.add_argument(
         "-c", "--nocolor", dest="colors", help="do not use colors in the output", action="store_false", default=True)
     parser.add_argument("--csv", dest="csv", help="print as csv", action="store_true")
@@ -106,6 +366,113 @@ Color codes corresponding to ratings:
         dest="state",
         help='show only jobs with given state(s) as comma-separated list: "Q,H,R,E,C" (default: show all)',
     )
+    parser.add_argument(
+        "--resources",
+        dest="resources",
+        help="show also the given optional resources as comma-separated list: %s"
+        % ", ".join(res for res in RESOURCES if res not in RESLIST),
+    )
+    parser.add_argument(
+        "--filter",
+        dest="filter",
+        metavar="EXPR",
+        help="show only jobs matching a filter expression, eg. 'queue==mpi and mem.usage<30 and ncore.avail>=16' "
+        "(fields: %s; operators: %s, ~ for a regular expression; combine with and, or, not and parentheses)"
+        % (", ".join(STRING_NAMES + NUMBER_NAMES), ", ".join(sorted(OPERATORS))),
+    )
+    parser.add_argument(
+        "--diff",
+        dest="diff",
+        metavar="OLDFILE",
+        help="show only jobs that were added, removed or changed since the given older xml file "
+        "(compared with --infile if given, else with the output of 'qstat -xt')",
+    )
+    parser.add_argument(
+        "--diff-threshold",
+        dest="diff_threshold",
+        type=float,
+        default=DIFF_THRESHOLD,
+        help="minimum change in usage (%%) for a job to be reported as changed (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top", dest="top", type=int, metavar="N", help="show only the N jobs wasting the most resources")
+    parser.add_argument(
+        "--by",
+        dest="by",
+        choices=sorted(TOP_METRICS),
+        default="waste",
+        help="wasted resource to select the --top jobs by: unused core-hours (cores), unused memory gb-hours (mem), "
+        "unused walltime of completed jobs (walltime), or unused core-hours counting memory beyond the free "
+        "amount per core as used cores (waste) (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--recommend",
+        dest="recommend",
+        help="add the finished jobs to the history, and show recommended resources for similar jobs",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--history",
+        dest="history",
+        default=HISTORY_FILE,
+        help="json file to keep the history of finished jobs for --recommend (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        dest="prometheus_textfile",
+        metavar="DIR",
+        help="write OpenMetrics job usage metrics to the given node_exporter textfile directory",
+    )
+    parser.add_argument(
+        "--prometheus-port",
+        dest="prometheus_port",
+        metavar="PORT",
+        type=int,
+        help="serve OpenMetrics job usage metrics over http on the given local port (updated at most every %ss)"
+        % PROMETHEUS_INTERVAL,
+    )
+    parser.add_argument(
+        "--archive",
+        dest="archive",
+        metavar="OUTFILE",
+        help="write the selected jobs to a snapshot archive, which can be read much faster than xml with --infile",
+    )
+    parser.add_argument(
+        "--batch",
+        dest="batch",
+        metavar="PATH",
+        help="summarize all xml files or snapshot archives in a directory or matching a glob pattern: "
+        "efficiency per owner and queue, number of jobs per state, and wasted resources",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        dest="processes",
+        type=int,
+        help="number of processes for --batch (default: number of cpus)",
+    )
+    parser.add_argument(
+        "--queues",
+        dest="queues",
+        help="show the wait-time quantiles per queue, the number of jobs started and completed per hour, "
+        "and the wait time of finished jobs per usage of their requested resources",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--engine",
+        dest="engine",
+        choices=sorted(ENGINES),
+        default="etree",
+        help="xml parser engine: ElementTree (etree), or scanning the raw bytes for the required fields only (fast) "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "-u",
+        "--user",
+        dest="user",
+        help="show only jobs of given user(s) as comma-separated list, or 'all' (default: the current user "
+        "for the output of 'qstat -xt', all users for --infile, --batch, --archive, --queues and the metrics exporter)",
+    )
     parser.add_argument("-d", "--demo", dest="demo", help="show demo output and exit", action="store_true")
     parser.add_argument("-v", "--version", dest="version", help="show version and exit", action="store_true")
 
@@ -126,18 +493,128 @@ Color codes corresponding to ratings:
         demo_myresources(alerts=args.alerts)
         sys.exit()
 
-    if args.infile:
+    states = args.state.split(",") if args.state else None
+
+    if args.resources:
+        extra = [res for res in args.resources.split(",") if res not in RESLIST]
+        try:
+            enable_resources(RESLIST + extra)
+        except ValueError as err:
+            parser.error(str(err))
+        if args.infile and is_archive(args.infile):
+            parser.error("snapshot archives only contain the resources %s" % ", ".join(RESLIST))
+
+    filters = None
+    if args.filter:
         try:
-            tree = ET.parse(args.infile)
-        except (IOError, ET.ParseError):
-            print("Error parsing xml file: %s" % args.infile)
+            filters = JobFilter(args.filter)
+        except FilterError as err:
+            parser.error(str(err))
+
+    # only the output of 'qstat -xt' is limited to the current user by default
+    live = not (
+        args.infile or args.batch or args.archive or args.queues or args.prometheus_textfile or args.prometheus_port
+    )
+    owners = select_owners(args.user, jobids=args.jobid, live=live)
+
+    if args.diff:
+        diff_myresources(
+            args.diff,
+            args.infile,
+            jobids=args.jobid,
+            states=states,
+            threshold=args.diff_threshold,
+            as_csv=args.csv,
+            engine=args.engine,
+            owners=owners,
+            filters=filters,
+        )
+        sys.exit()
+
+    if args.top is not None:
+        if args.top < 1:
+            parser.error("--top must be a positive number")
+        top_myresources(
+            args.infile,
+            args.top,
+            args.by,
+            jobids=args.jobid,
+            states=states,
+            as_csv=args.csv,
+            alerts=args.alerts,
+            colors=args.colors,
+            engine=args.engine,
+            owners=owners,
+            filters=filters,
+        )
+        sys.exit()
+
+    if args.batch:
+        batch_myresources(
+            args.batch,
+            jobids=args.jobid,
+            states=states,
+            as_csv=args.csv,
+            engine=args.engine,
+            processes=args.processes,
+            owners=owners,
+            expression=args.filter,
+        )
+        sys.exit()
+
+    if args.queues:
+        queues_myresources(
+            args.infile, jobids=args.jobid, states=states, engine=args.engine, owners=owners, filters=filters)
+        sys.exit()
+
+    if args.prometheus_textfile or args.prometheus_port:
+        export_myresources(
+            args.infile,
+            textfile_dir=args.prometheus_textfile,
+            port=args.prometheus_port,
+            jobids=args.jobid,
+            states=states,
+            engine=args.engine,
+            owners=owners,
+            filters=filters,
+        )
+        sys.exit()
+
+    if args.recommend:
+        recommend_myresources(
+            args.infile,
+            args.history,
+            jobids=args.jobid,
+            states=states,
+            as_csv=args.csv,
+            engine=args.engine,
+            owners=owners,
+            filters=filters,
+        )
+        sys.exit()
+
+    if args.archive:
+        try:
+            jobs = get_jobs(
+                args.infile, jobids=args.jobid, states=states, engine=args.engine, owners=owners, filters=filters)
+            njobs = write_archive(jobs, args.archive)
+        except READ_ERRORS:
+            print("Error parsing xml file: %s" % (args.infile or "qstat -xt"))
             sys.exit()
-    else:
-        _, xmlstring = asyncloop("qstat -xt")
-        tree = ET.ElementTree(ET.fromstring(xmlstring))
+        print("%d jobs written to %s" % (njobs, args.archive))
+        sys.exit()
 
-    root = tree.getroot()
-    if not root:
+    # read the whole input before printing, so invalid input does not end in partial output
+    try:
+        if args.infile and is_archive(args.infile):
+            jobs = list(get_jobs(args.infile, jobids=args.jobid, states=states, owners=owners, filters=filters))
+        else:
+            job_fields = list(iter_job_fields(xml_source(args.infile), engine=args.engine, owners=owners))
+            if not job_fields:
+                sys.exit()
+            jobs = list(select_jobs(job_fields, jobids=args.jobid, states=states, filters=filters))
+    except READ_ERRORS:
+        print("Error parsing xml file: %s" % (args.infile or "qstat -xt"))
         sys.exit()
 
     if args.csv:
@@ -145,17 +622,7 @@ Color codes corresponding to ratings:
     else:
         write_header()
 
-    for jobdata in root:
-        job = parse_xml(jobdata)
-        if args.jobid:
-            if job["jobid"] not in args.jobid:
-                continue
-        if args.state:
-            states = args.state.split(",")
-            if job["state"] not in states:
-                continue
-
-        job = calc_usage(job)
+    for job in jobs:
         if args.csv:
             csvstring = csv_string(job)
             write_string(csvstring)
@@ -168,7 +635,11 @@ Color codes corresponding to ratings:
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except MyResourcesError as err:
+        sys.stderr.write("Error: %s\n" % err)
+        sys.exit(1)
     #    suppress the following error when piping the output:
     #        close failed in file object destructor:
     #        sys.excepthook is missing
@@ -0,0 +1,152 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Library API: job records with calculated resource usage, without printing or exiting
+
+All functions only keep state in local variables and the objects they return,
+so they can be called from several threads at once, eg. by a web service.
+The resources of the records are given per call instead of with utils.enable_resources.
+Errors are raised as exceptions:
+ - MyResourcesError: unsupported job data, or 'qstat -xt' failed
+ - ET.ParseError: invalid xml
+ - ArchiveError: invalid snapshot archive
+ - IOError: unreadable file
+"""
+import threading
+import time
+from io import BytesIO
+
+from vsc.utils.run import asyncloop
+
+from vsc.myresources.constants import CACHE_INTERVAL
+from vsc.myresources.utils import MyResourcesError, get_alerts, iter_jobs, iter_snapshot, match_job, resource_set
+
+
+def qstat_source():
+    """ get the output of 'qstat -xt' as a file object """
+    exitcode, xmlstring = asyncloop("qstat -xt")
+    if exitcode:
+        raise MyResourcesError("qstat -xt failed with exit code %s: %s" % (exitcode, xmlstring.strip()))
+    if not isinstance(xmlstring, bytes):
+        xmlstring = xmlstring.encode("utf-8")
+    return BytesIO(xmlstring)
+
+
+def iter_records(
+    source=None, jobids=None, states=None, owners=None, engine="etree", alerts=False, filters=None, resources=None
+):
+    """
+    iterate over the jobs with calculated resource usage
+    source: xml file name or snapshot archive, file object with xml, or None to run 'qstat -xt'
+    jobids, states, owners: only jobs with given jobIDs, states and owners
+    filters: only jobs matching a compiled filter expression (JobFilter)
+    engine: xml parser engine, one of ENGINES
+    alerts: add the list of alert messages of each job as 'alerts'
+    resources: names of the resources (default: RESLIST), snapshot archives always have the RESLIST resources
+    """
+    if source is None:
+        source = qstat_source()
+    resources = resource_set(resources)
+    if hasattr(source, "read"):
+        jobs = iter_jobs(
+            source, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters, resources=resources
+        )
+    else:
+        jobs = iter_snapshot(
+            source, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters, resources=resources
+        )
+    for job in jobs:
+        if alerts:
+            job["alerts"] = get_alerts(job)
+        yield job
+
+
+def copy_job(job):
+    """ copy a job record, so callers can modify it without changing the cached record """
+    record = dict(job)
+    for key, value in job.items():
+        # the resources, including the optional ones
+        if isinstance(value, dict):
+            record[key] = dict(value)
+    if "alerts" in job:
+        record["alerts"] = list(job["alerts"])
+    return record
+
+
+class JobCache(object):
+    """
+    thread-safe cache of the job records of a source, read again at most once per interval seconds
+    each call returns copies of the cached records, the source is read by one thread at a time
+    a file object can only be read once: its data is kept, so the cache always has the same records
+    """
+
+    def __init__(self, source=None, interval=CACHE_INTERVAL, engine="etree", resources=None):
+        self.source = source
+        self._data = None
+        if hasattr(source, "read"):
+            self._data = source.read()
+            if not isinstance(self._data, bytes):
+                self._data = self._data.encode("utf-8")
+        self.interval = interval
+        self.engine = engine
+        self.resources = resources
+        # cached records, and the rows of the records of each owner
+        self._cache = None
+        self._time = None
+        self._lock = threading.Lock()
+
+    def _cached_jobs(self):
+        with self._lock:
+            now = time.time()
+            if self._time is None or now - self._time >= self.interval:
+                # replace the cache instead of updating it, readers keep a consistent snapshot
+                source = self.source if self._data is None else BytesIO(self._data)
+                jobs = list(iter_records(source, engine=self.engine, alerts=True, resources=self.resources))
+                owner_rows = {}
+                for row, job in enumerate(jobs):
+                    owner_rows.setdefault(job["owner"], []).append(row)
+                self._cache = (jobs, owner_rows)
+                self._time = now
+            return self._cache
+
+    def jobs(self, jobids=None, states=None, owners=None, filters=None):
+        """
+        get copies of the cached job records with given jobIDs, states and owners (if any)
+        filters: only jobs matching a compiled filter expression (JobFilter)
+        only the records of the given owners are checked, using the owner index of the cache
+        """
+        jobs, owner_rows = self._cached_jobs()
+        if owners:
+            jobs = [jobs[row] for row in sorted(row for owner in set(owners) for row in owner_rows.get(owner, []))]
+        return [
+            copy_job(job)
+            for job in jobs
+            if match_job(job, jobids=jobids, states=states) and (filters is None or filters.match(job))
+        ]
+
+    def clear(self):
+        """ read the source again on the next call """
+        with self._lock:
+            self._time = None
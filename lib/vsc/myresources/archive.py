@@ -0,0 +1,367 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Columnar snapshot archive of jobs with calculated resource usage
+
+An archive file contains the jobs of one snapshot as fixed-width columns,
+so readers can memory-map the file and scan columns without parsing xml:
+ - header: magic, format version, size of the json metadata
+ - json metadata: number of jobs, byte order, code tables, and name, type code and offset of each column
+ - columns: one array per job field, each aligned to 8 bytes
+   - numbers: 'd' (float64, NaN for unknown) or 'i' (int32, -1 for unknown)
+   - codes: 'I' (uint32 index in a code table in the metadata, CODE_NONE for unknown), for few distinct values
+   - strings: 'I' (uint32 offset and length in the string table, STRING_NONE length for unknown)
+ - string table
+ - job-ID index: 'I' (uint32 row numbers, sorted by job ID)
+ - owner index: 'I' (uint32 row numbers, grouped by owner code), with the start of each group in the metadata
+
+Timestamps are stored as 'd' columns, float64 represents all integer timestamps exactly.
+"""
+from __future__ import division
+import array
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from vsc.myresources.constants import RESLIST, TIMESTAMPS
+
+MAGIC = b"MYRA"
+ARCHIVE_VERSION = 1
+HEADER = struct.Struct("<4sII")
+ALIGN = 8
+CODE_NONE = STRING_NONE = 0xFFFFFFFF
+INT_NONE = -1
+PY2 = sys.version_info[0] == 2
+
+USAGE_FIELDS = ["avail", "used", "usage", "usage_for_free"]
+STRING_COLUMNS = ["jobid", "jobname", "exit_status", "nodes"]
+CODE_COLUMNS = ["owner", "state", "queue"]
+
+
+class ArchiveError(ValueError):
+    """ invalid or unsupported snapshot archive """
+
+
+def res_column(res, field):
+    return "%s_%s" % (res, field)
+
+
+def column_types():
+    """ type code of each column of the archive """
+    types = [(name, "s") for name in STRING_COLUMNS] + [(name, "c") for name in CODE_COLUMNS] + [("cput", "d")]
+    types.extend((name, "d") for name in TIMESTAMPS)
+    for res in RESLIST:
+        for field in USAGE_FIELDS:
+            # the number of cores is an integer
+            types.append((res_column(res, field), "i" if (res, field) == ("ncore", "avail") else "d"))
+    return types
+
+
+def is_archive(filename):
+    """ check if a file is a snapshot archive """
+    try:
+        with open(filename, "rb") as fih:
+            return fih.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+def decode(raw):
+    """ decode a string from the string table, like the xml parser returns it """
+    text = raw.decode("utf-8")
+    if PY2:
+        # ElementTree returns plain strings for ascii text in Python 2
+        try:
+            text = text.encode("ascii")
+        except UnicodeError:
+            pass
+    return text
+
+
+def write_archive(jobs, filename):
+    """
+    write jobs with calculated resource usage to a snapshot archive, atomically replacing an existing file
+    returns: number of jobs
+    """
+    types = column_types()
+    columns = {}
+    for name, typecode in types:
+        columns[name] = array.array({"s": "I", "c": "I", "d": "d", "i": "i"}[typecode])
+    codes = dict((name, {}) for name in CODE_COLUMNS)
+    strings = bytearray()
+
+    njobs = 0
+    for job in jobs:
+        njobs += 1
+        for name in STRING_COLUMNS:
+            if job[name] is None:
+                columns[name].extend([0, STRING_NONE])
+            else:
+                raw = job[name].encode("utf-8") if not isinstance(job[name], bytes) else job[name]
+                columns[name].extend([len(strings), len(raw)])
+                strings.extend(raw)
+        for name in CODE_COLUMNS:
+            if job[name] is None:
+                columns[name].append(CODE_NONE)
+            else:
+                columns[name].append(codes[name].setdefault(job[name], len(codes[name])))
+        columns["cput"].append(float("nan") if job["cput"] is None else job["cput"])
+        for name in TIMESTAMPS:
+            columns[name].append(float("nan") if job[name] is None else job[name])
+        for res in RESLIST:
+            for field in USAGE_FIELDS:
+                value = job[res][field]
+                column = columns[res_column(res, field)]
+                if column.typecode == "i":
+                    column.append(INT_NONE if value is None else int(value))
+                else:
+                    column.append(float("nan") if value is None else value)
+
+    jobids = [bytes(strings[off:off + length]) for off, length in zip(columns["jobid"][::2], columns["jobid"][1::2])]
+    index = array.array("I", sorted(range(njobs), key=jobids.__getitem__))
+    owner_codes = columns["owner"]
+    # sorting is stable, so the rows of each owner stay in their original order
+    owner_index = array.array("I", sorted(range(njobs), key=owner_codes.__getitem__))
+    owner_starts = [0] * (len(codes["owner"]) + 1)
+    for code in owner_codes:
+        if code != CODE_NONE:
+            owner_starts[code + 1] += 1
+    for code in range(len(codes["owner"])):
+        owner_starts[code + 1] += owner_starts[code]
+
+    # data sections in file order, offsets are relative to the end of the metadata
+    sections = [(name, typecode, columns[name]) for name, typecode in types]
+    sections.append(("strings", "b", strings))
+    sections.append(("jobid_index", "I", index))
+    sections.append(("owner_index", "I", owner_index))
+    offset = 0
+    layout = []
+    for name, typecode, data in sections:
+        offset += -offset % ALIGN
+        size = len(data) * (data.itemsize if isinstance(data, array.array) else 1)
+        layout.append((name, typecode, offset, size))
+        offset += size
+
+    meta = {
+        "njobs": njobs,
+        "byteorder": sys.byteorder,
+        "codes": dict((name, sorted(codes[name], key=codes[name].get)) for name in CODE_COLUMNS),
+        "owner_index": owner_starts,
+        "columns": layout,
+    }
+    meta = json.dumps(meta).encode("utf-8")
+    meta += b" " * (-(HEADER.size + len(meta)) % ALIGN)
+
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), prefix=".myresources")
+    try:
+        with os.fdopen(fd, "wb") as fih:
+            fih.write(HEADER.pack(MAGIC, ARCHIVE_VERSION, len(meta)))
+            fih.write(meta)
+            position = 0
+            for (_, _, data), (_, _, offset, _) in zip(sections, layout):
+                fih.write(b"\0" * (offset - position))
+                fih.write(data.tostring() if PY2 and isinstance(data, array.array) else bytes(data))
+                position = offset + len(data) * (data.itemsize if isinstance(data, array.array) else 1)
+        # mkstemp creates the file readable by the owner only, archives are shared for replay
+        os.chmod(tmpname, 0o644)
+        os.rename(tmpname, filename)
+    except Exception:
+        os.remove(tmpname)
+        raise
+    return njobs
+
+
+class Archive(object):
+    """
+    memory-mapped snapshot archive, use it as a context manager or close it
+    the columns are views of the mapped file: they must not be used after the archive is closed
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as fih:
+            try:
+                self._mmap = mmap.mmap(fih.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file, cannot be mapped
+                raise ArchiveError("%s is not a snapshot archive" % filename)
+        try:
+            self._open(filename)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _open(self, filename):
+        """ read and check the header and metadata, raises ArchiveError for invalid archives """
+        if len(self._mmap) < HEADER.size:
+            raise ArchiveError("%s is not a snapshot archive" % filename)
+        magic, version, metasize = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ArchiveError("%s is not a snapshot archive" % filename)
+        if version != ARCHIVE_VERSION:
+            raise ArchiveError("unsupported snapshot archive version in %s: %s" % (filename, version))
+        start = HEADER.size + metasize
+        if len(self._mmap) < start:
+            raise ArchiveError("truncated snapshot archive %s" % filename)
+        try:
+            meta = json.loads(self._mmap[HEADER.size:start].decode("utf-8"))
+            byteorder = meta["byteorder"]
+            self.njobs = meta["njobs"]
+            self.codes = dict(
+                (name, [decode(value.encode("utf-8")) for value in values]) for name, values in meta["codes"].items()
+            )
+            self._owner_starts = meta["owner_index"]
+            self._sections = dict(
+                (name, (typecode, start + offset, size)) for name, typecode, offset, size in meta["columns"]
+            )
+            owners = self.codes["owner"]
+        except (KeyError, TypeError, AttributeError, ValueError):
+            # ValueError: invalid json or utf-8
+            raise ArchiveError("invalid metadata in snapshot archive %s" % filename)
+        if byteorder != sys.byteorder:
+            raise ArchiveError("snapshot archive %s was written with %s byte order" % (filename, byteorder))
+        for typecode, offset, size in self._sections.values():
+            if offset + size > len(self._mmap):
+                raise ArchiveError("truncated snapshot archive %s" % filename)
+        self._owner_codes = dict((owner, code) for code, owner in enumerate(owners))
+        self._columns = {}
+
+    def __len__(self):
+        return self.njobs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        release the columns and unmap the file
+        if the caller still holds views derived from the columns (eg. slices), the file is unmapped when they are gone
+        """
+        for column in self._columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def column(self, name):
+        """
+        get a column as a zero-copy view of the memory-mapped file (a copy in Python 2), valid until close()
+        string columns contain alternating offsets and lengths in the string table
+        """
+        if name not in self._columns:
+            typecode, offset, size = self._sections[name]
+            arraytype = {"s": "I", "c": "I", "b": "B"}.get(typecode, typecode)
+            if PY2:
+                column = array.array(arraytype)
+                column.fromstring(self._mmap[offset:offset + size])
+            else:
+                column = memoryview(self._mmap)[offset:offset + size].cast(arraytype)
+            self._columns[name] = column
+        return self._columns[name]
+
+    def string(self, name, row):
+        """ get the string of a string column in the given row """
+        column = self.column(name)
+        offset, length = column[2 * row], column[2 * row + 1]
+        if length == STRING_NONE:
+            return None
+        start = self._sections["strings"][1] + offset
+        return decode(self._mmap[start:start + length])
+
+    def code(self, name, row):
+        """ get the value of a code column in the given row """
+        code = self.column(name)[row]
+        return None if code == CODE_NONE else self.codes[name][code]
+
+    def job(self, row):
+        """ get the job in the given row, in the same format as calc_usage returns it """
+        job = dict.fromkeys(["ppn"])
+        for name in STRING_COLUMNS:
+            job[name] = self.string(name, row)
+        for name in CODE_COLUMNS:
+            job[name] = self.code(name, row)
+        cput = self.column("cput")[row]
+        job["cput"] = None if math.isnan(cput) else cput
+        for name in TIMESTAMPS:
+            value = self.column(name)[row]
+            job[name] = None if math.isnan(value) else int(value)
+        for res in RESLIST:
+            job[res] = {}
+            for field in USAGE_FIELDS:
+                name = res_column(res, field)
+                value = self.column(name)[row]
+                if self._sections[name][0] == "i":
+                    job[res][field] = None if value == INT_NONE else value
+                else:
+                    job[res][field] = None if math.isnan(value) else value
+        return job
+
+    def __iter__(self):
+        for row in range(self.njobs):
+            yield self.job(row)
+
+    def owner_rows(self, owner):
+        """ get the rows of the jobs of an owner with the owner index, in their original order """
+        code = self._owner_codes.get(owner)
+        if code is None:
+            return []
+        return self.column("owner_index")[self._owner_starts[code]:self._owner_starts[code + 1]].tolist()
+
+    def find(self, jobid):
+        """ find a job by its job ID with the job-ID index, None if not found """
+        index = self.column("jobid_index")
+        low, high = 0, self.njobs
+        while low < high:
+            mid = (low + high) // 2
+            if self.string("jobid", index[mid]) < jobid:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.njobs and self.string("jobid", index[low]) == jobid:
+            return self.job(index[low])
+        return None
+
+
+def iter_archive(filename, owners=None):
+    """
+    iterate over the jobs in a snapshot archive
+    owners: only jobs of given owners, reading only their rows with the owner index
+    """
+    with Archive(filename) as archive:
+        if owners:
+            rows = sorted(row for owner in set(owners) for row in archive.owner_rows(owner))
+        else:
+            rows = range(len(archive))
+        for row in rows:
+            yield archive.job(row)
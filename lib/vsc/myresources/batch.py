@@ -0,0 +1,238 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Batch replay of many snapshot files in a process pool
+
+Each worker summarizes one snapshot file into the latest observation of each job, which are merged associatively,
+so the result does not depend on how the files are distributed over the workers.
+A job that is seen in several snapshots is only counted once, with its latest observation.
+"""
+from __future__ import division, print_function
+import glob
+import multiprocessing
+import os
+import time
+
+try:
+    import xml.etree.cElementTree as ET  # Python 2
+except ImportError:
+    import xml.etree.ElementTree as ET  # Python 3.9+
+
+from vsc.myresources.constants import RESLIST
+from vsc.myresources.filters import JobFilter
+from vsc.myresources.resources import RESOURCES
+from vsc.myresources.top import TOP_METRICS
+from vsc.myresources.utils import aggregate_job, iter_snapshot, new_aggregate
+
+# order of the job states during the life of a job
+STATE_ORDER = dict((state, order) for order, state in enumerate(["Q", "H", "R", "E", "C"]))
+
+
+def snapshot_files(path):
+    """ get the snapshot files in a directory, or matching a glob pattern, sorted by name """
+    if os.path.isdir(path):
+        names = [os.path.join(path, name) for name in os.listdir(path) if not name.startswith(".")]
+    else:
+        names = glob.glob(path)
+    return sorted(name for name in names if os.path.isfile(name))
+
+
+def new_summary():
+    """ generate a new, empty summary of snapshot files """
+    return {
+        "files": 0,
+        "failed": [],
+        # jobID: latest observation of the job, see add_observation
+        "jobs": {},
+    }
+
+
+def observation_rank(job):
+    """ order of the observations of a job in different snapshots: completed later, longer running, later state """
+    return (job["comp_time"] or 0, job["walltime"]["used"] or 0.0, STATE_ORDER.get(job["state"], -1))
+
+
+def add_observation(latest, job):
+    """ keep the latest observation of a job, so jobs seen in several snapshots are only counted once """
+    other = latest.get(job["jobid"])
+    if other is None or observation_rank(job) > observation_rank(other):
+        latest[job["jobid"]] = job
+
+
+def summarize_jobs(summary, jobs):
+    """ add jobs with calculated resource usage to a summary """
+    for job in jobs:
+        add_observation(summary["jobs"], job)
+    return summary
+
+
+def merge_summaries(summary, other):
+    """ add another summary to a summary """
+    summary["files"] += other["files"]
+    summary["failed"].extend(other["failed"])
+    for job in other["jobs"].values():
+        add_observation(summary["jobs"], job)
+    return summary
+
+
+def summary_totals(summary):
+    """
+    aggregate the latest observation of each job in a summary
+    returns: dictionary with the number of jobs, the jobs per state, the aggregate per (owner, queue),
+             and the total waste per TOP_METRICS metric
+    """
+    totals = {"jobs": 0, "states": {}, "owners": {}, "waste": dict.fromkeys(TOP_METRICS, 0.0)}
+    # in order of job ID, so the sums do not depend on the order of the snapshots
+    for jobid in sorted(summary["jobs"]):
+        job = summary["jobs"][jobid]
+        totals["jobs"] += 1
+        totals["states"][job["state"]] = totals["states"].get(job["state"], 0) + 1
+        key = (job["owner"] or "", job["queue"] or "")
+        if key not in totals["owners"]:
+            totals["owners"][key] = new_aggregate()
+        aggregate_job(totals["owners"][key], job)
+        for by, (metric, _) in TOP_METRICS.items():
+            totals["waste"][by] += metric(job) or 0.0
+    return totals
+
+
+# compiled filter expression of a worker process, see init_worker
+_worker_filters = None
+
+
+def init_worker(expression):
+    """ compile the filter expression once per worker process, compiled filters cannot be pickled """
+    global _worker_filters
+    _worker_filters = JobFilter(expression) if expression else None
+
+
+def summarize_snapshot(filename, jobids=None, states=None, owners=None, engine="etree", filters=None):
+    """
+    summarize one snapshot file (xml or archive)
+    filters: compiled filter expression (JobFilter)
+    """
+    summary = new_summary()
+    summary["files"] = 1
+    try:
+        jobs = iter_snapshot(filename, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters)
+        summarize_jobs(summary, jobs)
+    except (IOError, ValueError, ET.ParseError) as err:
+        return dict(new_summary(), failed=[(filename, str(err))])
+    return summary
+
+
+def summarize_file(task):
+    """
+    summarize one snapshot file in a worker, with the filter compiled by init_worker
+    task: tuple of file name, jobids, states and owners to select, xml parser engine
+    """
+    filename, jobids, states, owners, engine = task
+    return summarize_snapshot(
+        filename, jobids=jobids, states=states, owners=owners, engine=engine, filters=_worker_filters
+    )
+
+
+def summarize_files(filenames, jobids=None, states=None, owners=None, expression=None, engine="etree", processes=None):
+    """
+    summarize snapshot files in a pool of processes (default: number of cpus)
+    expression: filter expression, see JobFilter, compiled once per process
+    returns: merged summary, elapsed time in seconds
+    """
+    start = time.time()
+    summary = new_summary()
+    if processes == 1 or len(filenames) < 2:
+        filters = JobFilter(expression) if expression else None
+        for filename in filenames:
+            partial = summarize_snapshot(
+                filename, jobids=jobids, states=states, owners=owners, engine=engine, filters=filters
+            )
+            merge_summaries(summary, partial)
+    else:
+        tasks = [(filename, jobids, states, owners, engine) for filename in filenames]
+        pool = multiprocessing.Pool(processes=processes, initializer=init_worker, initargs=(expression,))
+        try:
+            for partial in pool.imap_unordered(summarize_file, tasks):
+                merge_summaries(summary, partial)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return summary, time.time() - start
+
+
+def throughput_string(summary, elapsed):
+    elapsed = max(elapsed, 1e-6)
+    return "throughput: %.1f files/s, %.0f jobs/s (%d files, %d jobs in %.1f s)" % (
+        summary["files"] / elapsed,
+        len(summary["jobs"]) / elapsed,
+        summary["files"],
+        len(summary["jobs"]),
+        elapsed,
+    )
+
+
+def efficiency(aggr, res):
+    """ used resources as percentage of the requested resources, None if nothing was requested """
+    if not aggr["avail"][res]:
+        return None
+    return 100.0 * aggr["used"][res] / aggr["avail"][res]
+
+
+def write_summary(summary, elapsed):
+    print(throughput_string(summary, elapsed))
+    for filename, err in summary["failed"]:
+        print("failed: %s (%s)" % (filename, err))
+    totals = summary_totals(summary)
+    print("jobs per state: %s" % ", ".join("%s: %d" % item for item in sorted(totals["states"].items())))
+    print(
+        "wasted: %s"
+        % ", ".join("%.1f %s (%s)" % (totals["waste"][by], unit, by) for by, (_, unit) in sorted(TOP_METRICS.items()))
+    )
+    print("")
+
+    fstring = "%-12s %-12s %8s" + " %9s" * len(RESLIST)
+    print("efficiency: used / requested resources of the jobs with known usage")
+    print(fstring % tuple(["owner", "queue", "jobs"] + [RESOURCES[res]["title"] for res in RESLIST]))
+    print(fstring % tuple(["-----", "-----", "----"] + ["-" * len(RESOURCES[res]["title"]) for res in RESLIST]))
+    for (owner, queue), aggr in sorted(totals["owners"].items()):
+        usage = []
+        for res in RESLIST:
+            eff = efficiency(aggr, res)
+            usage.append("-" if eff is None else "%.0f%%" % eff)
+        print(fstring % tuple([owner, queue, aggr["jobs"]] + usage))
+
+
+def write_summary_csv(summary):
+    header = ["owner", "queue", "jobs"]
+    for res in RESLIST:
+        header.extend(["%s_avail" % res, "%s_used" % res])
+    print(",".join(header))
+    for (owner, queue), aggr in sorted(summary_totals(summary)["owners"].items()):
+        row = [owner, queue, aggr["jobs"]]
+        for res in RESLIST:
+            row.extend([aggr["avail"][res], aggr["used"][res]])
+        print(",".join(str(i) for i in row))
@@ -37,7 +37,41 @@ UNITS = dict(zip(RESLIST, ["h", "gb", ""]))
 # the FOR_FREE value of 'mem' is per core
 FOR_FREE = dict(zip(RESLIST, [0.0, 2.0, 0.0]))
 LEVELS = dict(zip(RESLIST, [(50, 75, 99), (50, 75, 95), (70, 85, 101)]))  # usage levels in %: (medium, good, danger)
+# xml paths of the job fields that are needed for every job
+# the xml paths of the amounts of the enabled resources are added, see resources.resource_fields()
+XML_FIELDS = [
+    "Job_Id",
+    "Job_Name",
+    "Job_Owner",
+    "job_state",
+    "queue",
+    "exit_status",
+    "Resource_List/nodes",
+    "resources_used/cput",
+    "ctime",
+    "qtime",
+    "etime",
+    "start_time",
+    "comp_time",
+]
+# job timestamps in seconds since the epoch: created, queued, eligible to run, started, completed
+TIMESTAMPS = ["ctime", "qtime", "etime", "start_time", "comp_time"]
 WAITTIME = 1.0 / 12  # do not show ncore usage before this time
+HISTORY_FILE = "~/.myresources_history.json"  # local history store of finished jobs
+HISTORY_SAMPLES = 100  # number of most recent finished jobs kept per group of similar jobs
+HISTORY_SEEN = 1000  # number of most recent jobIDs kept per group of similar jobs, to not add jobs twice
+RECOMMEND_MIN_JOBS = 3  # minimum number of finished jobs in a group to recommend resources
+RECOMMEND_PERCENTILE = 95  # percentile of the used resources of a group to recommend
+RECOMMEND_MARGIN = 0.2  # safety margin added to the recommended memory and walltime
+RECOMMEND_MIN_WALLTIME = 0.25  # minimum recommended walltime in hours
+PROMETHEUS_FILE = "myresources.prom"  # file name in the node_exporter textfile directory
+PROMETHEUS_MAX_OWNERS = 50  # owners with the most requested cores get their own label, others are "other"
+PROMETHEUS_INTERVAL = 30  # minimum time in seconds between two updates of the served metrics
+QUEUE_ACCURACY = 0.01  # relative accuracy of the wait-time quantiles per queue
+QUEUE_QUANTILES = [50, 90, 99]  # wait-time quantiles (%) shown per queue
+QUEUE_USAGE_BINS = [25, 50, 75]  # usage levels in % that split finished jobs to compare their wait time
+CACHE_INTERVAL = 30  # minimum time in seconds between two reads of the source by the job cache of the library api
+DIFF_THRESHOLD = 10  # minimum change in usage (%) for a job to be reported as changed between snapshots
 COLORCODE = {"good": "green", "medium": "yellow", "bad": "red", "-": "blue", "danger": "magenta"}
 FGCOL = {  # foreground colors
     "green": u"\u001b[32m",
@@ -0,0 +1,174 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Compare two snapshots of 'qstat -xt' and report only the jobs that changed
+"""
+from __future__ import division, print_function
+import csv
+from collections import OrderedDict
+
+try:
+    from StringIO import StringIO  # Python 2
+except ImportError:
+    from io import StringIO  # Python 3
+
+from vsc.myresources.constants import RESLIST, DIFF_THRESHOLD
+from vsc.myresources.resources import RESOURCES
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+DELTA_FIELDS = ["avail", "used", "usage"]
+
+
+def index_jobs(jobs):
+    """ build a job-ID hash index of the given jobs, keeping their original order """
+    index = OrderedDict()
+    for job in jobs:
+        index[job["jobid"]] = job
+    return index
+
+
+def job_delta(old, new):
+    """
+    calculate the difference new - old of the calc_usage fields of each resource
+    a difference is None if the value is unknown in one of the jobs
+    """
+    delta = {}
+    for res in RESLIST:
+        delta[res] = dict.fromkeys(DELTA_FIELDS)
+        for field in DELTA_FIELDS:
+            if None not in (old[res][field], new[res][field]):
+                delta[res][field] = new[res][field] - old[res][field]
+    return delta
+
+
+def job_changed(old, new, delta, threshold=DIFF_THRESHOLD):
+    """
+    check if a job changed enough between two snapshots to be reported:
+    a different state, queue or exit status, different requested resources,
+    or a change in usage of at least threshold %
+    """
+    for key in ("state", "queue", "exit_status"):
+        if old[key] != new[key]:
+            return True
+    for res in RESLIST:
+        if old[res]["avail"] != new[res]["avail"]:
+            return True
+        if delta[res]["usage"] is not None and abs(delta[res]["usage"]) >= threshold:
+            return True
+    return False
+
+
+def diff_jobs(old_index, new_jobs, threshold=DIFF_THRESHOLD, select=None):
+    """
+    stream the jobs of the new snapshot against the index of the old snapshot
+    select: predicate on a job, applied after matching the jobs by job ID:
+            a job is reported if it is selected in either snapshot, eg. a job that went from R to C
+    yields tuples (change, old_job, new_job, delta) for added, removed and changed jobs only
+    """
+    seen = set()
+    for new in new_jobs:
+        old = old_index.get(new["jobid"])
+        if old is not None:
+            seen.add(new["jobid"])
+        if select is not None and not select(new) and (old is None or not select(old)):
+            continue
+        if old is None:
+            yield ADDED, None, new, None
+            continue
+        delta = job_delta(old, new)
+        if job_changed(old, new, delta, threshold=threshold):
+            yield CHANGED, old, new, delta
+
+    for jobid, old in old_index.items():
+        if jobid not in seen and (select is None or select(old)):
+            yield REMOVED, old, None, None
+
+
+def diff_string(change, old, new, delta):
+    """ write the change of a job and the difference of each resource """
+    job = new or old
+    state = job["state"]
+    if change == CHANGED and old["state"] != new["state"]:
+        state = "%s>%s" % (old["state"], new["state"])
+
+    lines = [" ".join([change.ljust(12), job["jobid"].rjust(13), state, job["jobname"]])]
+    if delta is None:
+        return "\n".join(lines)
+
+    for res in RESLIST:
+        dstr = dict.fromkeys(DELTA_FIELDS, "-")
+        for field in DELTA_FIELDS:
+            if delta[res][field] is not None:
+                dstr[field] = "%+.1f" % delta[res][field]
+        if delta[res]["usage"] is not None:
+            dstr["usage"] = "%+d%%" % int(round(delta[res]["usage"]))
+        lines.append(
+            " ".join(
+                [
+                    RESOURCES[res]["title"].rjust(12),
+                    dstr["used"].rjust(10),
+                    RESOURCES[res]["unit"].rjust(2),
+                    dstr["avail"].rjust(10),
+                    RESOURCES[res]["unit"].rjust(2),
+                    dstr["usage"].rjust(6),
+                ]
+            )
+        )
+    return "\n".join(lines)
+
+
+def diff_csv_string(change, old, new, delta):
+    job = new or old
+    full_list = [
+        change,
+        job["jobid"],
+        old["state"] if old else None,
+        new["state"] if new else None,
+        job["jobname"],
+    ]
+    for res in RESLIST:
+        for field in DELTA_FIELDS:
+            full_list.append(delta[res][field] if delta else None)
+    csvstring = StringIO()
+    writer = csv.writer(csvstring)
+    writer.writerow(full_list)
+    return csvstring.getvalue().rstrip()
+
+
+def write_header_diff():
+    fstring = "%-12s %13s %s %s"
+    print(fstring % ("change", "jobID", "S", "jobname"))
+    fstring = "%12s %13s %13s %6s"
+    print(fstring % ("resource", "used", "requested", "usage"))
+    print(fstring % ("--------", "----", "---------", "-----"))
+
+
+def write_header_diff_csv():
+    header = ["change", "jobID", "state_old", "state", "jobname"]
+    for res in RESLIST:
+        header.extend(["%s_%s_delta" % (res, field) for field in DELTA_FIELDS])
+    print(",".join(header))
@@ -0,0 +1,217 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Export job resource usage as OpenMetrics text, for the node_exporter textfile collector or over http
+
+All metrics are collected in one pass over the jobs.
+Per-owner aggregates keep only the PROMETHEUS_MAX_OWNERS owners with the most requested cores as label,
+so the number of aggregate series stays bounded.
+"""
+from __future__ import division
+import os
+import tempfile
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # Python 2
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer  # Python 3
+
+from vsc.myresources.constants import (
+    RESLIST,
+    PROMETHEUS_FILE,
+    PROMETHEUS_INTERVAL,
+    PROMETHEUS_MAX_OWNERS,
+)
+from vsc.myresources.resources import RESOURCES
+from vsc.myresources.utils import aggregate_job, merge_aggregate, new_aggregate
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+OTHER_OWNER = "other"
+JOB_FIELDS = ["avail", "used", "usage"]
+# units of the resources in the help texts, eg. 'walltime in h, memory in gb, cores'
+RES_UNITS = ", ".join(
+    "%(title)s in %(unit)s" % RESOURCES[res] if RESOURCES[res]["unit"] else RESOURCES[res]["title"] for res in RESLIST
+)
+# metric name and help text of the per-job and per-owner/queue metric families
+JOB_METRICS = {
+    "avail": ("myresources_job_requested", "Requested resources of a job (%s)" % RES_UNITS),
+    "used": ("myresources_job_used", "Used resources of a job (%s)" % RES_UNITS),
+    "usage": ("myresources_job_usage_percent", "Used resources of a job as percentage of the requested resources"),
+}
+OWNER_METRICS = {
+    "avail": (
+        "myresources_owner_requested",
+        "Sum of the requested resources of the jobs of an owner in a queue with known usage",
+    ),
+    "used": ("myresources_owner_used", "Sum of the used resources of the jobs of an owner in a queue with known usage"),
+}
+
+
+def escape_label(value):
+    """ escape a label value """
+    return ("%s" % value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels_string(labels):
+    """ write a list of (name, value) label tuples """
+    return "{%s}" % ",".join('%s="%s"' % (name, escape_label(value)) for name, value in labels)
+
+
+def family_lines(name, help_text, samples):
+    """ write a gauge metric family with its samples as (labels string, value) tuples """
+    lines = ["# TYPE %s gauge" % name, "# HELP %s %s" % (name, help_text)]
+    lines.extend("%s%s %r" % (name, labels, float(value)) for labels, value in samples)
+    return lines
+
+
+def collect_metrics(jobs, max_owners=PROMETHEUS_MAX_OWNERS):
+    """
+    collect per-job and per-owner/queue metrics of jobs with calculated resource usage in one pass
+    returns: OpenMetrics text
+    """
+    job_samples = dict((field, []) for field in JOB_FIELDS)
+    # (owner, queue): aggregate
+    aggregates = {}
+    # (state, queue): count
+    counts = {}
+    for job in jobs:
+        owner = job["owner"] or ""
+        queue = job["queue"] or ""
+        counts[(job["state"], queue)] = counts.get((job["state"], queue), 0) + 1
+
+        key = (owner, queue)
+        if key not in aggregates:
+            aggregates[key] = new_aggregate()
+        aggregate_job(aggregates[key], job)
+
+        prefix = labels_string([("jobid", job["jobid"]), ("owner", owner), ("queue", queue)])[:-1]
+        for res in RESLIST:
+            labels = '%s,resource="%s"}' % (prefix, res)
+            for field in JOB_FIELDS:
+                if job[res][field] is not None:
+                    job_samples[field].append((labels, job[res][field]))
+
+    aggregates = limit_owners(aggregates, max_owners)
+
+    lines = []
+    for field in JOB_FIELDS:
+        lines.extend(family_lines(JOB_METRICS[field][0], JOB_METRICS[field][1], job_samples[field]))
+
+    for field in ["avail", "used"]:
+        samples = []
+        for (owner, queue), aggr in sorted(aggregates.items()):
+            for res in RESLIST:
+                labels = labels_string([("owner", owner), ("queue", queue), ("resource", res)])
+                samples.append((labels, aggr[field][res]))
+        lines.extend(family_lines(OWNER_METRICS[field][0], OWNER_METRICS[field][1], samples))
+
+    samples = [
+        (labels_string([("owner", owner), ("queue", queue)]), aggr["jobs"])
+        for (owner, queue), aggr in sorted(aggregates.items())
+    ]
+    lines.extend(family_lines("myresources_owner_jobs", "Number of jobs of an owner in a queue", samples))
+
+    samples = [
+        (labels_string([("state", state), ("queue", queue)]), count) for (state, queue), count in sorted(counts.items())
+    ]
+    lines.extend(family_lines("myresources_jobs", "Number of jobs per state and queue", samples))
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def limit_owners(aggregates, max_owners):
+    """ merge the aggregates of all but the max_owners owners with the most requested cores into OTHER_OWNER """
+    cores = {}
+    for (owner, _), aggr in aggregates.items():
+        cores[owner] = cores.get(owner, 0) + aggr["avail"]["ncore"]
+    if len(cores) <= max_owners:
+        return aggregates
+
+    keep = set(sorted(cores, key=lambda owner: (-cores[owner], owner))[:max_owners])
+    limited = {}
+    for (owner, queue), aggr in aggregates.items():
+        key = (owner if owner in keep else OTHER_OWNER, queue)
+        if key not in limited:
+            limited[key] = new_aggregate()
+        merge_aggregate(limited[key], aggr)
+    return limited
+
+
+def write_textfile(metrics, directory, filename=PROMETHEUS_FILE):
+    """ write the metrics to a file in the node_exporter textfile directory, atomically replacing the old file """
+    fd, tmpname = tempfile.mkstemp(dir=directory, prefix=".%s." % filename)
+    try:
+        with os.fdopen(fd, "w") as fih:
+            fih.write(metrics)
+        os.chmod(tmpname, 0o644)
+        os.rename(tmpname, os.path.join(directory, filename))
+    except Exception:
+        os.remove(tmpname)
+        raise
+
+
+def serve_metrics(get_metrics, port, interval=PROMETHEUS_INTERVAL, host="localhost"):
+    """
+    serve the metrics over http
+    get_metrics: function returning the metrics text, called at most once per interval seconds
+    """
+    cache = {"metrics": None, "time": None}
+    lock = threading.Lock()
+
+    def cached_metrics():
+        with lock:
+            now = time.time()
+            if cache["time"] is None or now - cache["time"] >= interval:
+                cache["metrics"] = get_metrics().encode("utf-8")
+                cache["time"] = now
+            return cache["metrics"]
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            try:
+                metrics = cached_metrics()
+            except Exception as err:
+                self.send_error(500, str(err))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(metrics)))
+            self.end_headers()
+            self.wfile.write(metrics)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer((host, port), MetricsHandler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,191 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Fast extraction of the fields of jobs from the raw bytes of 'qstat -xt' output
+
+Only the tags of the extracted xml paths are searched for: everything else, like the huge Variable_List,
+is skipped without building element objects.
+This relies on the structure of the xml generated by qstat: each Job element contains its fields
+as leaf elements without attributes, and top-level field names are not reused for nested elements.
+Malformed xml is only detected as far as the scanned tags are concerned.
+"""
+import mmap
+import re
+import sys
+
+try:
+    import xml.etree.cElementTree as ET  # Python 2
+except ImportError:
+    import xml.etree.ElementTree as ET  # Python 3.9+
+
+try:
+    unichr
+except NameError:
+    unichr = chr  # Python 3
+
+from vsc.myresources.constants import XML_FIELDS
+
+PY2 = sys.version_info[0] == 2
+
+ROOT_START = b"<Data"
+JOB_START = b"<Job>"
+JOB_END = b"</Job>"
+ENTITY_RE = re.compile(u"&(#x[0-9a-fA-F]+|#[0-9]+|lt|gt|amp|quot|apos);")
+ENTITIES = {u"lt": u"<", u"gt": u">", u"amp": u"&", u"quot": u'"', u"apos": u"'"}
+
+
+def _split_path(path):
+    """ split an xml path in the start and end tag of its parent (if any) and of its leaf """
+    tags = [(("<%s>" % tag).encode("ascii"), ("</%s>" % tag).encode("ascii")) for tag in path.split("/")]
+    if len(tags) == 1:
+        return None, tags[0]
+    return tags[0], tags[1]
+
+
+def field_tags(fields):
+    """ (field, parent tags, leaf tags) for each of the given xml paths """
+    return [(path,) + _split_path(path) for path in fields]
+
+
+OWNER_TAGS = _split_path("Job_Owner")[1]
+
+
+def _entity(match):
+    name = match.group(1)
+    if name.startswith(u"#x"):
+        return unichr(int(name[2:], 16))
+    if name.startswith(u"#"):
+        return unichr(int(name[1:]))
+    return ENTITIES[name]
+
+
+def to_text(raw):
+    """ convert the raw bytes of an element to text, like the ElementTree parser does """
+    if not raw:
+        return None
+    text = raw.decode("utf-8")
+    if u"\r" in text:
+        text = text.replace(u"\r\n", u"\n").replace(u"\r", u"\n")
+    if u"&" in text:
+        text = ENTITY_RE.sub(_entity, text)
+    if PY2:
+        # ElementTree returns plain strings for ascii text in Python 2
+        try:
+            text = text.encode("ascii")
+        except UnicodeError:
+            pass
+    return text
+
+
+def _find_text(data, tags, start, end):
+    """ get the raw bytes of the first element with given tags between start and end """
+    tag_start, tag_end = tags
+    pos = data.find(tag_start, start, end)
+    if pos < 0:
+        return None
+    pos += len(tag_start)
+    stop = data.find(b"<", pos, end)
+    if stop < 0 or data.find(tag_end, stop, stop + len(tag_end)) != stop:
+        raise ET.ParseError("unexpected content in element %s" % tag_start.decode("ascii"))
+    return data[pos:stop]
+
+
+def extract_fast_fields(data, start, end, tags):
+    """
+    get the text of the fields of the job between positions start and end of the raw data
+    tags: field_tags() of the xml paths to extract
+    returns: dictionary of xml path: text
+    """
+    sections = {}
+    fields = {}
+    for path, parent, leaf in tags:
+        if parent is None:
+            fields[path] = to_text(_find_text(data, leaf, start, end))
+            continue
+
+        if parent not in sections:
+            pos = data.find(parent[0], start, end)
+            if pos < 0:
+                sections[parent] = None
+            else:
+                pos += len(parent[0])
+                stop = data.find(parent[1], pos, end)
+                if stop < 0:
+                    raise ET.ParseError("no end tag found for element %s" % parent[0].decode("ascii"))
+                sections[parent] = (pos, stop)
+        section = sections[parent]
+        if section is None:
+            fields[path] = None
+        else:
+            fields[path] = to_text(_find_text(data, leaf, section[0], section[1]))
+    return fields
+
+
+def read_source(source):
+    """
+    get the raw bytes of the output of 'qstat -xt'
+    source: xml file name (memory-mapped) or file object
+    """
+    if hasattr(source, "read"):
+        data = source.read()
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        return data
+
+    with open(source, "rb") as xmlfile:
+        try:
+            return mmap.mmap(xmlfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file, cannot be mapped
+            return b""
+
+
+def iter_fast_fields(source, owners=None, fields=XML_FIELDS):
+    """
+    iterate over the fields of all jobs in the output of 'qstat -xt' by scanning the raw bytes
+    source: xml file name or file object
+    owners: only jobs of given owners, checked on the raw bytes before extracting the other fields
+    fields: xml paths to extract
+    """
+    tags = field_tags(fields)
+    if owners:
+        owners = set(owner.encode("utf-8") if not isinstance(owner, bytes) else owner for owner in owners)
+    data = read_source(source)
+    # the root element follows the xml declaration, if any
+    if data[:1024].strip() and data.find(ROOT_START, 0, 1024) < 0:
+        raise ET.ParseError("no Data element found")
+    pos = data.find(JOB_START)
+    while pos >= 0:
+        end = data.find(JOB_END, pos)
+        if end < 0:
+            raise ET.ParseError("no end tag found for job at position %s" % pos)
+        pos += len(JOB_START)
+        if owners:
+            owner = _find_text(data, OWNER_TAGS, pos, end)
+            if owner is None or owner.split(b"@")[0] not in owners:
+                pos = data.find(JOB_START, end)
+                continue
+        yield extract_fast_fields(data, pos, end, tags)
+        pos = data.find(JOB_START, end)
@@ -0,0 +1,269 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Filter expressions on job fields, compiled once into predicates
+
+Grammar:
+    expression := conjunction ("or" conjunction)*
+    conjunction := negation ("and" negation)*
+    negation := "not" negation | "(" expression ")" | comparison
+    comparison := name operator value
+    operator := "==" | "!=" | "<" | "<=" | ">" | ">=" | "~" (regular expression search)
+    value := word | number | quoted string
+
+Names are the raw fields jobid, jobname, owner, state, queue and nodes, which are checked before the job is built,
+and the fields exit_status, cput, the timestamps and <resource>.<avail|used|usage>, which are checked after the
+resource usage is calculated. The resources can be any registered resource; comparisons with unknown (None) values,
+including the values of resources that are not computed, are always false.
+"""
+import operator
+import re
+
+from vsc.myresources.constants import TIMESTAMPS
+from vsc.myresources.resources import RESOURCES
+from vsc.myresources.utils import MyResourcesError, job_id, job_owner
+
+# raw fields: xml path and conversion of the text to the job field
+RAW_NAMES = {
+    "jobid": ("Job_Id", job_id),
+    "jobname": ("Job_Name", None),
+    "owner": ("Job_Owner", job_owner),
+    "state": ("job_state", None),
+    "queue": ("queue", None),
+    "nodes": ("Resource_List/nodes", None),
+}
+NUMBER_NAMES = ["cput"] + TIMESTAMPS
+NUMBER_NAMES += ["%s.%s" % (res, field) for res in RESOURCES for field in ["avail", "used", "usage"]]
+STRING_NAMES = sorted(RAW_NAMES) + ["exit_status"]
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+STRING_OPERATORS = ["==", "!=", "~"]
+TOKEN = re.compile(r"""\s*(?:(==|!=|<=|>=|<|>|~)|([()])|"([^"]*)"|'([^']*)'|([^\s()=!<>~"']+))""")
+
+
+class FilterError(MyResourcesError):
+    """ invalid filter expression """
+
+
+def tokenize(expression):
+    """
+    split a filter expression into tokens
+    returns: list of (kind, text) with kind one of 'op', 'paren', 'string', 'word'
+    """
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = TOKEN.match(expression, pos)
+        if match is None:
+            raise FilterError("invalid filter expression at position %d: %s" % (pos, expression[pos:]))
+        op, paren, dquoted, squoted, word = match.groups()
+        if op is not None:
+            tokens.append(("op", op))
+        elif paren is not None:
+            tokens.append(("paren", paren))
+        elif word is not None:
+            tokens.append(("word", word))
+        else:
+            tokens.append(("string", dquoted if dquoted is not None else squoted))
+        pos = match.end()
+    return tokens
+
+
+class Parser(object):
+    """ recursive descent parser of filter expressions into trees of tuples """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kinds=None, text=None, expected=None):
+        """ take the next token, which must be one of the given kinds and have the given text (if any) """
+        token = self.peek()
+        if token[0] is None or (kinds and token[0] not in kinds) or (text and token[1] != text):
+            found = "end of expression" if token[0] is None else "'%s'" % token[1]
+            raise FilterError(
+                "invalid filter expression '%s': expected %s, found %s"
+                % (self.expression, expected or text or "more", found)
+            )
+        self.pos += 1
+        return token[1]
+
+    def is_keyword(self, keyword):
+        return self.peek() == ("word", keyword)
+
+    def parse(self):
+        tree = self.expression_rule()
+        if self.pos < len(self.tokens):
+            raise FilterError("invalid filter expression '%s': unexpected '%s'" % (self.expression, self.peek()[1]))
+        return tree
+
+    def expression_rule(self):
+        terms = [self.conjunction()]
+        while self.is_keyword("or"):
+            self.take()
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def conjunction(self):
+        terms = [self.negation()]
+        while self.is_keyword("and"):
+            self.take()
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else ("and", terms)
+
+    def negation(self):
+        if self.is_keyword("not"):
+            self.take()
+            return ("not", self.negation())
+        if self.peek() == ("paren", "("):
+            self.take()
+            tree = self.expression_rule()
+            self.take(["paren"], ")")
+            return tree
+        return self.comparison()
+
+    def comparison(self):
+        name = self.take(["word"], expected="field name")
+        if name not in NUMBER_NAMES and name not in STRING_NAMES:
+            known = ", ".join(STRING_NAMES + NUMBER_NAMES)
+            raise FilterError("unknown field in filter expression: %s (use one of %s)" % (name, known))
+        op = self.take(["op"], expected="operator")
+        value = self.take(["word", "string"], expected="value")
+
+        if name in NUMBER_NAMES:
+            if op not in OPERATORS:
+                raise FilterError("operator %s not supported for number field %s" % (op, name))
+            try:
+                value = float(value)
+            except ValueError:
+                raise FilterError("invalid number in filter expression: %s %s %s" % (name, op, value))
+        elif op not in STRING_OPERATORS:
+            raise FilterError(
+                "operator %s not supported for text field %s (use one of %s)" % (op, name, ", ".join(STRING_OPERATORS))
+            )
+        elif op == "~":
+            try:
+                value = re.compile(value)
+            except re.error as err:
+                raise FilterError("invalid regular expression in filter expression: %s (%s)" % (value, err))
+        return ("compare", name, op, value)
+
+
+def names(tree):
+    """ names of all fields in a tree """
+    if tree[0] == "compare":
+        return set([tree[1]])
+    if tree[0] == "not":
+        return names(tree[1])
+    return set().union(*[names(term) for term in tree[1]])
+
+
+def field_getter(name):
+    """ function getting the value of a field from the text of the XML_FIELDS of a job """
+    path, convert = RAW_NAMES[name]
+    if convert is None:
+        return lambda fields: fields[path]
+    return lambda fields: None if fields[path] is None else convert(fields[path])
+
+
+def job_getter(name):
+    """ function getting the value of a field from a job with calculated resource usage """
+    if "." in name:
+        res, field = name.split(".")
+        return lambda job: job[res][field] if res in job else None
+    return lambda job: job[name]
+
+
+def compile_tree(tree, getter):
+    """ compile a tree into a predicate, getting the field values with getter(name) """
+    if tree[0] == "compare":
+        _, name, op, operand = tree
+        get = getter(name)
+        if op == "~":
+            search = operand.search
+
+            def predicate(record):
+                value = get(record)
+                return value is not None and search(value) is not None
+
+        else:
+            compare = OPERATORS[op]
+
+            def predicate(record):
+                value = get(record)
+                return value is not None and compare(value, operand)
+
+        return predicate
+
+    if tree[0] == "not":
+        term = compile_tree(tree[1], getter)
+        return lambda record: not term(record)
+
+    terms = [compile_tree(term, getter) for term in tree[1]]
+    if tree[0] == "and":
+        return lambda record: all(term(record) for term in terms)
+    return lambda record: any(term(record) for term in terms)
+
+
+def always(_):
+    return True
+
+
+class JobFilter(object):
+    """
+    compiled filter expression
+    match_fields: predicate on the text of the XML_FIELDS of a job, checked before the job is built
+    match_job: predicate on a job with calculated resource usage, for the conditions on the other fields
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        tree = Parser(expression).parse()
+        # the terms of a top-level 'and' that only use raw fields are checked before the job is built
+        raw_terms = []
+        job_terms = []
+        for term in tree[1] if tree[0] == "and" else [tree]:
+            if names(term) <= set(RAW_NAMES):
+                raw_terms.append(term)
+            else:
+                job_terms.append(term)
+        self.match_fields = compile_tree(("and", raw_terms), field_getter) if raw_terms else always
+        self.match_job = compile_tree(("and", job_terms), job_getter) if job_terms else always
+        self._match_raw_job = compile_tree(("and", raw_terms), job_getter) if raw_terms else always
+
+    def match(self, job):
+        """ check all conditions on a job with calculated resource usage, eg. from a snapshot archive """
+        return self._match_raw_job(job) and self.match_job(job)
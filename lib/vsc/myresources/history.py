@@ -0,0 +1,236 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Local history store of finished jobs, and right-sizing recommendations for groups of similar jobs
+
+Jobs are grouped by owner, job name, queue and requested nodes.
+The recommendation of a group is recalculated only when new finished jobs are added to it,
+so looking up the recommendation for a job is a single dictionary lookup.
+
+To not add a job twice when an older snapshot is replayed, each group keeps the HISTORY_SEEN most recent jobIDs,
+and the highest (job number, array index) that was dropped from them: lower ones are not added again.
+"""
+from __future__ import division
+import json
+import math
+import os
+import re
+import tempfile
+
+from vsc.myresources.constants import (
+    HISTORY_SAMPLES,
+    HISTORY_SEEN,
+    RECOMMEND_MARGIN,
+    RECOMMEND_MIN_JOBS,
+    RECOMMEND_MIN_WALLTIME,
+    RECOMMEND_PERCENTILE,
+)
+from vsc.myresources.utils import count_cores
+
+HISTORY_VERSION = 1
+SAMPLE_RES = ["mem", "walltime", "ncore"]
+
+
+def new_history():
+    """ generate a new, empty history """
+    return {"version": HISTORY_VERSION, "groups": {}}
+
+
+def load_history(filename):
+    """ load the history from a json file, or start a new history if the file does not exist """
+    filename = os.path.expanduser(filename)
+    if not os.path.exists(filename):
+        return new_history()
+    with open(filename) as fih:
+        history = json.load(fih)
+    if history.get("version") != HISTORY_VERSION:
+        raise ValueError("unsupported history version in %s: %s" % (filename, history.get("version")))
+    return history
+
+
+def save_history(history, filename):
+    """ save the history to a json file, atomically replacing the existing file """
+    filename = os.path.expanduser(filename)
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), prefix=".myresources")
+    try:
+        with os.fdopen(fd, "w") as fih:
+            json.dump(history, fih)
+        os.rename(tmpname, filename)
+    except Exception:
+        os.remove(tmpname)
+        raise
+
+
+def group_jobname(job):
+    """ job name shared by the group of a job: the array index is removed from the job names of array jobs """
+    jobname = job["jobname"] or ""
+    index = re.search(r"\[([0-9]+)\]$", job["jobid"])
+    if index and jobname.endswith("-%s" % index.group(1)):
+        jobname = jobname[: -len(index.group(1)) - 1]
+    return jobname
+
+
+def group_key(job):
+    """ key of the group of similar jobs: owner, job name, queue and requested nodes """
+    return "|".join([job["owner"] or "", group_jobname(job), job["queue"] or "", job["nodes"] or ""])
+
+
+def is_sample(job):
+    """ only jobs that completed successfully show how much they really need """
+    if job["state"] != "C" or job["exit_status"] != "0":
+        return False
+    return None not in [job[res]["used"] for res in SAMPLE_RES]
+
+
+def percentile(values, perc):
+    """ nearest-rank percentile of a list of values """
+    values = sorted(values)
+    rank = int(math.ceil(perc / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+def count_nodes(nodes):
+    """ number of requested nodes, eg. 2 for '1:ppn=8+1:ppn=8' or 'nic66:ppn=5+nic67:ppn=5' """
+    if not nodes:
+        return 1
+    nnodes = 0
+    for nodecore in nodes.split("+"):
+        node = nodecore.split(":")[0]
+        nnodes += int(node) if node.isdigit() else 1
+    return nnodes
+
+
+def job_number(jobid):
+    """ job number and array index as list, eg. [1257508, 2] for '1257508[2]', [1257509, -1] for '1257509' """
+    number, _, index = jobid.rstrip("]").partition("[")
+    return [int(number), int(index) if index else -1]
+
+
+def new_group(job):
+    """ generate a new group of similar jobs, without jobs """
+    group = dict((field, []) for field in ["jobids", "seen"] + SAMPLE_RES)
+    group.update({
+        "jobname": group_jobname(job),
+        "queue": job["queue"],
+        "nodes": job["nodes"],
+        "dropped": None,
+        "recommend": None,
+    })
+    return group
+
+
+def is_seen(group, jobid):
+    """ check if a job was added to a group before """
+    if jobid in group["seen"]:
+        return True
+    return group["dropped"] is not None and job_number(jobid) <= group["dropped"]
+
+
+def recommend(group):
+    """
+    calculate the recommended resources of a group of similar jobs:
+    a percentile of the used resources, plus a safety margin for memory and walltime
+    cores are not given a margin, and never more than requested: using too few cores does not kill a job
+    returns: dictionary with mem (gb), walltime (h) and ppn, or None if there are too few jobs
+    """
+    njobs = len(group["jobids"])
+    if njobs < RECOMMEND_MIN_JOBS:
+        return None
+
+    margin = 1 + RECOMMEND_MARGIN
+    mem = percentile(group["mem"], RECOMMEND_PERCENTILE) * margin
+    walltime = percentile(group["walltime"], RECOMMEND_PERCENTILE) * margin
+    if group["queue"] == "single_core":
+        ppn = 1
+    else:
+        nnodes = count_nodes(group["nodes"])
+        requested = int(math.ceil(count_cores(group) / nnodes))
+        ppn = int(math.ceil(percentile(group["ncore"], RECOMMEND_PERCENTILE) / nnodes))
+        ppn = min(max(ppn, 1), requested)
+    return {
+        "njobs": njobs,
+        "mem": max(int(math.ceil(mem)), 1),
+        # round up to quarter hours
+        "walltime": max(math.ceil(walltime * 4) / 4, RECOMMEND_MIN_WALLTIME),
+        "ppn": ppn,
+    }
+
+
+def update_history(history, jobs):
+    """
+    add the finished jobs that are not yet in the history,
+    and recalculate the recommendations of the groups that changed
+    returns: number of added jobs
+    """
+    groups = history["groups"]
+    changed = set()
+    added = 0
+    for job in jobs:
+        if not is_sample(job):
+            continue
+        key = group_key(job)
+        if key not in groups:
+            groups[key] = new_group(job)
+        group = groups[key]
+        if is_seen(group, job["jobid"]):
+            continue
+        changed.add(key)
+        added += 1
+        group["jobids"].append(job["jobid"])
+        for res in SAMPLE_RES:
+            group[res].append(job[res]["used"])
+        # keep only the most recent jobs
+        for field in ["jobids"] + SAMPLE_RES:
+            del group[field][:-HISTORY_SAMPLES]
+        group["seen"].append(job["jobid"])
+        if len(group["seen"]) > HISTORY_SEEN:
+            numbers = [job_number(jobid) for jobid in group["seen"][:-HISTORY_SEEN]]
+            group["dropped"] = max(numbers + [group["dropped"] or [0, -1]])
+            del group["seen"][:-HISTORY_SEEN]
+
+    for key in changed:
+        groups[key]["recommend"] = recommend(groups[key])
+    return added
+
+
+def get_recommendation(history, job):
+    """ look up the recommended resources for a job, None if there is no recommendation """
+    group = history["groups"].get(group_key(job))
+    if group is None:
+        return None
+    return group["recommend"]
+
+
+def resource_list(job, rec):
+    """ write the recommended resources of a job as qsub resource list """
+    hours = int(rec["walltime"])
+    minutes = int(round((rec["walltime"] - hours) * 60))
+    return "nodes=%s:ppn=%d,mem=%dgb,walltime=%02d:%02d:00" % (
+        count_nodes(job["nodes"]),
+        rec["ppn"],
+        rec["mem"],
+        hours,
+        minutes,
+    )
@@ -0,0 +1,222 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Queue wait-time and throughput analytics from the job timestamps
+
+Wait times are collected in mergeable sketches: histograms with logarithmic buckets,
+so every quantile has a bounded relative error and memory only grows with the log of the range of wait times.
+"""
+from __future__ import division, print_function
+import bisect
+import math
+import time
+
+from vsc.myresources.constants import (
+    QUEUE_ACCURACY,
+    QUEUE_QUANTILES,
+    QUEUE_USAGE_BINS,
+    RESLIST,
+    TIME_UNITS,
+)
+from vsc.myresources.resources import RESOURCES
+
+HOUR = TIME_UNITS["h"]
+
+
+def new_sketch(accuracy=QUEUE_ACCURACY):
+    """
+    generate a new, empty wait-time sketch
+    accuracy: relative error of the quantiles, wait times of less than 1 second count as 0
+    """
+    return {"gamma": (1 + accuracy) / (1 - accuracy), "count": 0, "zero": 0, "buckets": {}}
+
+
+def sketch_add(sketch, value):
+    """ add a value to a sketch, bucket k counts the values in (gamma^(k-1), gamma^k] """
+    sketch["count"] += 1
+    if value < 1:
+        sketch["zero"] += 1
+    else:
+        key = int(math.ceil(math.log(value, sketch["gamma"])))
+        sketch["buckets"][key] = sketch["buckets"].get(key, 0) + 1
+
+
+def merge_sketch(sketch, other):
+    """ add the values of another sketch with the same accuracy to a sketch """
+    if sketch["gamma"] != other["gamma"]:
+        raise ValueError("cannot merge sketches with different accuracy")
+    sketch["count"] += other["count"]
+    sketch["zero"] += other["zero"]
+    for key, count in other["buckets"].items():
+        sketch["buckets"][key] = sketch["buckets"].get(key, 0) + count
+    return sketch
+
+
+def sketch_quantile(sketch, quantile):
+    """ estimate the given quantile (%) of the values in a sketch, None if empty """
+    if not sketch["count"]:
+        return None
+    rank = quantile / 100 * (sketch["count"] - 1)
+    seen = sketch["zero"]
+    if rank < seen:
+        return 0.0
+    gamma = sketch["gamma"]
+    for key in sorted(sketch["buckets"]):
+        seen += sketch["buckets"][key]
+        if rank < seen:
+            # the value in the bucket with the smallest relative error for all values in the bucket
+            return 2 * gamma ** key / (gamma + 1)
+    return 2 * gamma ** max(sketch["buckets"]) / (gamma + 1)
+
+
+def wait_time(job):
+    """ time in seconds between the job becoming eligible to run (or queued) and its start, None if not started """
+    queued = job["etime"] or job["qtime"]
+    if not job["start_time"] or not queued:
+        return None
+    return max(job["start_time"] - queued, 0)
+
+
+def usage_bin(usage):
+    """ index of the bin of QUEUE_USAGE_BINS for a usage in % """
+    return bisect.bisect_right(QUEUE_USAGE_BINS, usage)
+
+
+def usage_bin_names():
+    """ names of the bins of QUEUE_USAGE_BINS """
+    names = ["%s-%s%%" % pair for pair in zip(QUEUE_USAGE_BINS[:-1], QUEUE_USAGE_BINS[1:])]
+    return ["<%s%%" % QUEUE_USAGE_BINS[0]] + names + [">=%s%%" % QUEUE_USAGE_BINS[-1]]
+
+
+def new_queue_stats(accuracy=QUEUE_ACCURACY):
+    """
+    generate new, empty queue analytics
+    queues: per queue the number of queued jobs, and a sketch of the wait time of the started jobs
+    started, completed: number of jobs per hour (start of the hour in seconds since the epoch)
+    usage: per resource and usage bin, a sketch of the wait time of the finished jobs
+    """
+    return {
+        "accuracy": accuracy,
+        "queues": {},
+        "started": {},
+        "completed": {},
+        "usage": dict((res, [new_sketch(accuracy) for _ in range(len(QUEUE_USAGE_BINS) + 1)]) for res in RESLIST),
+    }
+
+
+def new_queue(accuracy=QUEUE_ACCURACY):
+    return {"queued": 0, "wait": new_sketch(accuracy)}
+
+
+def count_hour(counts, timestamp):
+    hour = timestamp - timestamp % HOUR
+    counts[hour] = counts.get(hour, 0) + 1
+
+
+def add_job(stats, job):
+    """ add a job with calculated resource usage to queue analytics """
+    queue = job["queue"] or ""
+    if queue not in stats["queues"]:
+        stats["queues"][queue] = new_queue(stats["accuracy"])
+    if job["state"] in ("Q", "H"):
+        stats["queues"][queue]["queued"] += 1
+
+    wait = wait_time(job)
+    if wait is not None:
+        sketch_add(stats["queues"][queue]["wait"], wait)
+        # the usage of finished jobs shows how much they requested too much
+        if job["state"] in ("E", "C"):
+            for res in RESLIST:
+                if job[res]["usage"] is not None:
+                    sketch_add(stats["usage"][res][usage_bin(job[res]["usage"])], wait)
+
+    if job["start_time"]:
+        count_hour(stats["started"], job["start_time"])
+    if job["comp_time"]:
+        count_hour(stats["completed"], job["comp_time"])
+
+
+def collect_queue_stats(jobs, accuracy=QUEUE_ACCURACY):
+    """ queue analytics of jobs with calculated resource usage """
+    stats = new_queue_stats(accuracy)
+    for job in jobs:
+        add_job(stats, job)
+    return stats
+
+
+def merge_queue_stats(stats, other):
+    """ add other queue analytics to queue analytics """
+    for queue, entry in other["queues"].items():
+        if queue not in stats["queues"]:
+            stats["queues"][queue] = new_queue(stats["accuracy"])
+        stats["queues"][queue]["queued"] += entry["queued"]
+        merge_sketch(stats["queues"][queue]["wait"], entry["wait"])
+    for field in ["started", "completed"]:
+        for hour, count in other[field].items():
+            stats[field][hour] = stats[field].get(hour, 0) + count
+    for res in RESLIST:
+        for sketch, other_sketch in zip(stats["usage"][res], other["usage"][res]):
+            merge_sketch(sketch, other_sketch)
+    return stats
+
+
+def quantile_strings(sketch):
+    """ wait-time quantiles of a sketch in the unit of the walltime resource """
+    values = [sketch_quantile(sketch, quantile) for quantile in QUEUE_QUANTILES]
+    return ["-" if value is None else "%.2f" % (value / TIME_UNITS[RESOURCES["walltime"]["unit"]]) for value in values]
+
+
+def write_queue_stats(stats):
+    quantiles = ["p%s" % quantile for quantile in QUEUE_QUANTILES]
+    fstring = "%-12s %8s %8s" + " %8s" * len(QUEUE_QUANTILES)
+    print("wait time per queue (%s): from eligible to run until started" % RESOURCES["walltime"]["unit"])
+    print(fstring % tuple(["queue", "queued", "started"] + quantiles))
+    print(fstring % tuple(["-----", "------", "-------"] + ["-" * len(name) for name in quantiles]))
+    for queue, entry in sorted(stats["queues"].items()):
+        print(fstring % tuple([queue, entry["queued"], entry["wait"]["count"]] + quantile_strings(entry["wait"])))
+    print("")
+
+    fstring = "%-16s %8s %9s"
+    print("jobs started and completed per hour")
+    print(fstring % ("hour", "started", "completed"))
+    print(fstring % ("----", "-------", "---------"))
+    for hour in sorted(set(stats["started"]) | set(stats["completed"])):
+        print(
+            fstring
+            % (
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(hour)),
+                stats["started"].get(hour, 0),
+                stats["completed"].get(hour, 0),
+            )
+        )
+    print("")
+
+    fstring = "%-10s %-8s %8s" + " %8s" * len(QUEUE_QUANTILES)
+    print("wait time of finished jobs (%s) per usage of the requested resources" % RESOURCES["walltime"]["unit"])
+    print(fstring % tuple(["resource", "usage", "jobs"] + quantiles))
+    print(fstring % tuple(["--------", "-----", "----"] + ["-" * len(name) for name in quantiles]))
+    for res in RESLIST:
+        for name, sketch in zip(usage_bin_names(), stats["usage"][res]):
+            print(fstring % tuple([RESOURCES[res]["title"], name, sketch["count"]] + quantile_strings(sketch)))
@@ -0,0 +1,266 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Registry of the resources that myresources reports
+
+Each resource declares how to get its requested (avail) and used amount:
+ - from an xml path with one of the CONVERTERS, or
+ - with a python expression of the job fields (job) and the text of the xml fields (fields),
+and how to rate and render it. The used amounts are only set for started jobs.
+Only the xml paths of the enabled resources are extracted, on top of the XML_FIELDS of every job.
+Resources that the enabled ones depend on are computed as well, before them, but not shown.
+
+compile_resources() generates the source of the functions that fill in and rate all enabled resources of a job,
+with the rules of each resource as constants, so the per-job work has no loops or branches over the resources.
+"""
+from collections import OrderedDict, namedtuple
+
+from vsc.myresources.constants import FOR_FREE, LEVELS, RES_NAMES, UNITS, XML_FIELDS
+
+# name of the function converting the xml text of each unit
+CONVERTERS = {"mem": "convert_mem", "time": "convert_time", "number": "convert_number"}
+
+RESOURCES = OrderedDict()
+
+# compiled set of resources, see compile_resources()
+# names: shown resources, computed: all resources filled in, in order of their dependencies
+ResourceSet = namedtuple(
+    "ResourceSet", ["names", "computed", "fields", "source", "extract_resources", "calc_resources"]
+)
+
+
+def register_resource(
+    name,
+    title,
+    unit,
+    avail_path=None,
+    used_path=None,
+    convert="number",
+    avail_expr=None,
+    used_expr=None,
+    expr_paths=(),
+    requires=(),
+    for_free=0.0,
+    for_free_per_core=False,
+    levels=(50, 75, 95),
+    rate_running=True,
+    hide_before_waittime=False,
+    avail_format="%10.1f",
+    used_format="%10.1f",
+):
+    """
+    register a resource
+    title, unit: shown in the output
+    avail_path, used_path: xml paths of the requested and used amount, converted with CONVERTERS[convert]
+    avail_expr, used_expr: python expressions of job and fields, instead of an xml path
+    expr_paths: xml paths (not in XML_FIELDS) that avail_expr and used_expr get from fields
+    requires: resources that avail_expr and used_expr get from job
+              (ncore for for_free_per_core and walltime for hide_before_waittime are added)
+    for_free: amount that is counted as used for the rating (per requested core if for_free_per_core)
+    levels: usage levels in %: (medium, good, danger)
+    rate_running: rate the usage of running jobs
+    hide_before_waittime: do not show the usage if the used walltime < WAITTIME
+    avail_format, used_format: format of the requested and used amount
+    """
+    if convert not in CONVERTERS:
+        raise ValueError("unknown converter %s for resource %s (use one of %s)" % (convert, name, sorted(CONVERTERS)))
+    requires = list(requires)
+    for needed, flag in [("ncore", for_free_per_core), ("walltime", hide_before_waittime)]:
+        if flag and needed not in requires:
+            requires.append(needed)
+    RESOURCES[name] = {
+        "name": name,
+        "title": title,
+        "unit": unit,
+        "avail_path": avail_path,
+        "used_path": used_path,
+        "convert": convert,
+        "avail_expr": avail_expr,
+        "used_expr": used_expr,
+        "expr_paths": tuple(expr_paths),
+        "requires": tuple(requires),
+        "for_free": for_free,
+        "for_free_per_core": for_free_per_core,
+        "levels": tuple(levels),
+        "rate_running": rate_running,
+        "hide_before_waittime": hide_before_waittime,
+        "avail_format": avail_format,
+        "used_format": used_format,
+    }
+
+
+# resources in RESLIST, reported by default
+register_resource(
+    "walltime",
+    RES_NAMES["walltime"],
+    UNITS["walltime"],
+    avail_path="Resource_List/walltime",
+    used_path="resources_used/walltime",
+    convert="time",
+    for_free=FOR_FREE["walltime"],
+    levels=LEVELS["walltime"],
+    rate_running=False,
+)
+register_resource(
+    "mem",
+    RES_NAMES["mem"],
+    UNITS["mem"],
+    avail_path="Resource_List/mem",
+    used_path="resources_used/mem",
+    convert="mem",
+    for_free=FOR_FREE["mem"],
+    for_free_per_core=True,
+    levels=LEVELS["mem"],
+)
+register_resource(
+    "ncore",
+    RES_NAMES["ncore"],
+    UNITS["ncore"],
+    avail_expr="count_cores(job)",
+    used_expr='job["cput"] / job["walltime"]["used"] if job["cput"] and job["walltime"]["used"] is not None else None',
+    requires=["walltime"],
+    for_free=FOR_FREE["ncore"],
+    levels=LEVELS["ncore"],
+    hide_before_waittime=True,
+    avail_format="%s  ",
+)
+# optional resources
+register_resource(
+    "vmem",
+    "virt memory",
+    "gb",
+    avail_path="Resource_List/vmem",
+    used_path="resources_used/vmem",
+    convert="mem",
+    levels=LEVELS["mem"],
+)
+register_resource("energy", "energy", "J", used_path="resources_used/energy_used")
+register_resource("gpus", "gpus", "", avail_expr="count_gpus(job)", avail_format="%s  ")
+
+
+def resolve_resources(names):
+    """
+    all resources that are needed for the given resources, each after the resources it requires
+    raises ValueError for unknown resources and circular requirements
+    """
+    unknown = [name for name in names if name not in RESOURCES]
+    if unknown:
+        raise ValueError("unknown resources: %s (use one of %s)" % (", ".join(unknown), ", ".join(RESOURCES)))
+    resolved = []
+
+    def visit(name, path):
+        if name in resolved:
+            return
+        if name in path:
+            raise ValueError("circular requirement of resources: %s" % " -> ".join(path + [name]))
+        for needed in RESOURCES[name]["requires"]:
+            visit(needed, path + [name])
+        resolved.append(name)
+
+    for name in names:
+        visit(name, [])
+    return resolved
+
+
+def resource_fields(names):
+    """ xml paths to extract for the given resources: the XML_FIELDS and the paths of the resources """
+    fields = list(XML_FIELDS)
+    for name in names:
+        resource = RESOURCES[name]
+        for path in (resource["avail_path"], resource["used_path"]) + resource["expr_paths"]:
+            if path is not None and path not in fields:
+                fields.append(path)
+    return fields
+
+
+def value_source(resource, field):
+    """ python expression of the avail or used amount of a resource, None if unknown """
+    path = resource["%s_path" % field]
+    if path is not None:
+        return "%s(fields[%r])" % (CONVERTERS[resource["convert"]], path)
+    return resource["%s_expr" % field]
+
+
+def resources_source(names):
+    """ python source of the functions extract_resources(job, fields) and calc_resources(job) """
+    lines = ["def extract_resources(job, fields):"]
+    used = []
+    for name in names:
+        avail_source = value_source(RESOURCES[name], "avail")
+        if avail_source is not None:
+            lines.append('    job[%r]["avail"] = %s' % (name, avail_source))
+        used_source = value_source(RESOURCES[name], "used")
+        if used_source is not None:
+            used.append('        job[%r]["used"] = %s' % (name, used_source))
+    if used:
+        lines.append('    if job["state"] in ("R", "E", "C"):')
+        lines.extend(used)
+    lines.append("    return job")
+
+    lines.extend(["", "", "def calc_resources(job):"])
+    for name in names:
+        resource = RESOURCES[name]
+        for_free = '100.0 * %r / res["avail"]' % resource["for_free"]
+        if resource["for_free_per_core"]:
+            for_free += ' * job["ncore"]["avail"]'
+        lines.extend(
+            [
+                "    res = job[%r]" % name,
+                '    if res["avail"] is not None and res["used"] is not None:',
+                '        res["usage"] = round(100.0 * res["used"] / res["avail"])',
+            ]
+        )
+        if resource["hide_before_waittime"]:
+            lines.extend(
+                [
+                    '        if job["walltime"]["used"] is None or job["walltime"]["used"] < WAITTIME:',
+                    '            res["usage"] = None',
+                ]
+            )
+        lines.append('        res["usage_for_free"] = %s' % for_free)
+    lines.append("    return job")
+    return "\n".join(lines) + "\n"
+
+
+def compile_resources(names, helpers):
+    """
+    generate the functions that fill in and rate the given resources of a job
+    helpers: names available in the generated functions: the CONVERTERS, WAITTIME and the functions in avail_expr
+             and used_expr
+    the resources that they require are computed as well
+    returns: ResourceSet
+    """
+    computed = resolve_resources(names)
+    source = resources_source(computed)
+    namespace = dict(helpers)
+    exec(compile(source, "<myresources resources>", "exec"), namespace)
+    return ResourceSet(
+        names=tuple(names),
+        computed=tuple(computed),
+        fields=tuple(resource_fields(computed)),
+        source=source,
+        extract_resources=namespace["extract_resources"],
+        calc_resources=namespace["calc_resources"],
+    )
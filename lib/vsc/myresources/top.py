@@ -0,0 +1,102 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Select the jobs wasting the most resources
+"""
+from __future__ import division
+import heapq
+from itertools import count
+
+from vsc.myresources.resources import RESOURCES
+
+
+def wasted_cores(job):
+    """ unused core-hours: requested cores that did no work during the used walltime """
+    if None in (job["ncore"]["avail"], job["ncore"]["used"], job["walltime"]["used"]):
+        return None
+    return max(job["ncore"]["avail"] - job["ncore"]["used"], 0.0) * job["walltime"]["used"]
+
+
+def wasted_mem(job):
+    """ unused memory gb-hours, not counting the memory that we give for free """
+    if None in (job["mem"]["avail"], job["mem"]["used"], job["walltime"]["used"]):
+        return None
+    counted = max(job["mem"]["used"], RESOURCES["mem"]["for_free"] * job["ncore"]["avail"])
+    return max(job["mem"]["avail"] - counted, 0.0) * job["walltime"]["used"]
+
+
+def wasted_walltime(job):
+    """ unused hours of requested walltime, only known when the job is completed """
+    if job["state"] != "C" or None in (job["walltime"]["avail"], job["walltime"]["used"]):
+        return None
+    return max(job["walltime"]["avail"] - job["walltime"]["used"], 0.0)
+
+
+def wasted(job):
+    """
+    unused core-hours, where used memory beyond the memory we give for free per core
+    is counted as occupying cores
+    """
+    if None in (job["ncore"]["avail"], job["ncore"]["used"], job["walltime"]["used"]):
+        return None
+    used = job["ncore"]["used"]
+    if job["mem"]["used"] is not None:
+        used = max(used, job["mem"]["used"] / RESOURCES["mem"]["for_free"])
+    return max(job["ncore"]["avail"] - used, 0.0) * job["walltime"]["used"]
+
+
+TOP_METRICS = {
+    "cores": (wasted_cores, "core-hours"),
+    "mem": (wasted_mem, "gb-hours"),
+    "walltime": (wasted_walltime, "h"),
+    "waste": (wasted, "core-hours"),
+}
+
+
+def top_jobs(jobs, number, by="waste"):
+    """
+    select the given number of jobs with the highest non-zero value of a TOP_METRICS metric
+    jobs are streamed through a heap of fixed size, so memory does not grow with the number of jobs
+    returns: list of (value, job) tuples, highest value first
+    """
+    metric = TOP_METRICS[by][0]
+    heap = []
+    if number < 1:
+        return heap
+
+    # the counter breaks ties between equal values, so jobs are never compared
+    tiebreak = count()
+    for job in jobs:
+        value = metric(job)
+        if not value:
+            # nothing wasted, or unknown
+            continue
+        item = (value, -next(tiebreak), job)
+        if len(heap) < number:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    return [(value, job) for value, _, job in sorted(heap, reverse=True)]
@@ -27,6 +27,7 @@ Utilities for myresources
 """
 from __future__ import division, print_function
 import csv
+import getpass
 import re
 import sys
 
@@ -35,23 +36,34 @@ try:
 except ImportError:
     from io import StringIO  # Python 3
 
+try:
+    import xml.etree.cElementTree as ET  # Python 2
+except ImportError:
+    import xml.etree.ElementTree as ET  # Python 3.9+
+
 from vsc.myresources.constants import (
+    XML_FIELDS,
+    TIMESTAMPS,
     RESLIST,
-    RES_NAMES,
     MEM_UNITS,
     TIME_UNITS,
-    UNITS,
-    FOR_FREE,
-    LEVELS,
     WAITTIME,
     COLORCODE,
     FGCOL,
 )
+from vsc.myresources.archive import is_archive, iter_archive
+from vsc.myresources.fastparse import iter_fast_fields
+from vsc.myresources.resources import RESOURCES, compile_resources
+
+
+class MyResourcesError(ValueError):
+    """ job data that myresources does not support """
 
 
 def convert_mem(mem):
     """
-    convert memory string eg. '200mb' into a value in units of UNITS['mem']
+    convert memory string eg. '200mb' into a value in the unit of the mem resource
+    raises MyResourcesError for unsupported units
     """
     if mem is None:
         return None
@@ -59,21 +71,38 @@ def convert_mem(mem):
     value = float(value)
     unit = unit.lower()
     if unit not in MEM_UNITS.keys():
-        sys.stderr.write("Error: memory unit %s not supported. Use one of %s instead.\n" % (unit, MEM_UNITS.keys()))
-        sys.exit(1)
-    return (value * MEM_UNITS[unit]) / MEM_UNITS[UNITS["mem"]]
+        raise MyResourcesError("memory unit %s not supported. Use one of %s instead." % (unit, list(MEM_UNITS.keys())))
+    return (value * MEM_UNITS[unit]) / MEM_UNITS[RESOURCES["mem"]["unit"]]
 
 
 def convert_time(time):
     """
-    convert time string 'h:m:s' into a value in units of UNITS['walltime']
+    convert time string 'h:m:s' into a value in the unit of the walltime resource
     torque always reports time in the format hh:mm:ss
     """
     if time is None:
         return None
     h, m, s = [float(i) for i in time.split(":")]
     seconds = h * TIME_UNITS["h"] + m * TIME_UNITS["m"] + s * TIME_UNITS["s"]
-    return seconds / TIME_UNITS[UNITS["walltime"]]
+    return seconds / TIME_UNITS[RESOURCES["walltime"]["unit"]]
+
+
+def convert_number(number):
+    """
+    convert number string into a float
+    """
+    if number is None:
+        return None
+    return float(number)
+
+
+def convert_timestamp(timestamp):
+    """
+    convert timestamp string in seconds since the epoch into an integer
+    """
+    if not timestamp:
+        return None
+    return int(timestamp)
 
 
 def get_elem_text(tree, elemstr):
@@ -85,93 +114,317 @@ def get_elem_text(tree, elemstr):
     return None
 
 
-def new_job():
-    """ generate a new job dictionary with all values = None """
-    job = dict.fromkeys(["jobid", "jobname", "state", "queue", "exit_status", "ppn", "nodes", "cput"])
-    for res in RESLIST:
+def job_id(jobid):
+    """ get the job ID without the server name from the Job_Id text '1251253.master01.hydra.brussel.vsc' """
+    return re.match(r"[0-9]*(\[[0-9]*\])?", jobid).group(0)
+
+
+def job_owner(owner):
+    """ get the user name from the Job_Owner text 'user@submit_host' """
+    if not owner:
+        return None
+    return owner.split("@")[0]
+
+
+def select_owners(user=None, jobids=None, live=True):
+    """
+    get the owners of the jobs to show, None for all owners
+    user: comma-separated user names, or 'all'
+    jobids: jobs requested by jobID are shown whoever owns them
+    live: reading the output of 'qstat -xt', which is limited to the jobs of the current user by default
+    """
+    if user == "all":
+        return None
+    if user:
+        return user.split(",")
+    if not live or jobids:
+        return None
+    return [getpass.getuser()]
+
+
+def new_job(resources=None):
+    """
+    generate a new job dictionary with all values = None
+    resources: compiled ResourceSet (default: the enabled resources)
+    """
+    job = dict.fromkeys(["jobid", "jobname", "owner", "state", "queue", "exit_status", "ppn", "nodes", "cput"])
+    job.update(dict.fromkeys(TIMESTAMPS))
+    for res in (resources or _resources).computed:
         job[res] = dict.fromkeys(["avail", "used", "usage", "usage_for_free"])
     return job
 
 
-def parse_xml(jobdata):
+def count_cores(job):
+    """ count the requested cores of a job """
+    if job["queue"] == "single_core" or job["nodes"] is None:
+        return 1
+    ncore = 0
+    # parse all possible ways nodes and cores can be requested
+    # examples: '1:ppn=8+1:ppn=8' 'nic66:ppn=5+nic67:ppn=5' '1:ppn=8:enc8+1:ppn=8:enc8' '1:4' '1'
+    for nodecore in job["nodes"].split("+"):
+        nodecore = nodecore.split(":")
+        node = nodecore[0]
+        try:
+            core = nodecore[1]
+        except IndexError:
+            core = "1"
+        try:
+            nnode = int(node)
+        except ValueError:
+            nnode = 1
+        ppn = int(core.strip("ppn="))
+        ncore += nnode * ppn
+    return ncore
+
+
+def count_gpus(job):
+    """ count the requested gpus of a job, eg. '2:ppn=4:gpus=2' """
+    if job["nodes"] is None:
+        return None
+    ngpu = 0
+    for nodespec in job["nodes"].split("+"):
+        nodespec = nodespec.split(":")
+        try:
+            nnode = int(nodespec[0])
+        except ValueError:
+            nnode = 1
+        for prop in nodespec[1:]:
+            if prop.startswith("gpus="):
+                ngpu += nnode * int(prop[len("gpus="):])
+    return ngpu
+
+
+# names available in the generated functions of the resources
+RESOURCE_HELPERS = {
+    "convert_mem": convert_mem,
+    "convert_time": convert_time,
+    "convert_number": convert_number,
+    "count_cores": count_cores,
+    "count_gpus": count_gpus,
+    "WAITTIME": WAITTIME,
+}
+
+
+# compiled ResourceSets by the tuple of their names, they are immutable
+_resource_sets = {}
+
+
+def resource_set(names=None):
     """
-    parse an xml sub-tree containing data of 1 job
+    compile the given resources (default: RESLIST) and the resources they require, once per selection
+    returns: ResourceSet with the generated functions that fill in and rate the resources of a job
+    """
+    key = tuple(names or RESLIST)
+    if key not in _resource_sets:
+        _resource_sets[key] = compile_resources(key, RESOURCE_HELPERS)
+    return _resource_sets[key]
+
+
+_resources = resource_set()
+
+
+def enable_resources(names=None):
+    """
+    select the resources in the output, in the given order (default: RESLIST)
+    the enabled ResourceSet is replaced as a whole: jobs that are being read keep the set they started with
+    """
+    global _resources
+    _resources = resource_set(names)
+
+
+def enabled_resources():
+    """ names of the resources in the output """
+    return list(_resources.names)
+
+
+def extract_fields(jobdata, fields=XML_FIELDS):
+    """
+    get the text of the given xml paths from an xml sub-tree containing data of 1 job
+    returns: dictionary of xml path: text
+    """
+    return dict((path, get_elem_text(jobdata, path)) for path in fields)
+
+
+def build_job(fields, resources=None):
+    """
+    build a job from the text of its xml fields: the XML_FIELDS and the paths of the resources
+    resources: compiled ResourceSet (default: the enabled resources)
     returns: job dictionary
     """
-    job = new_job()
-    jobid = jobdata.find("Job_Id").text
-    job["jobid"] = re.match(r"[0-9]*(\[[0-9]*\])?", jobid).group(0)
-    job["jobname"] = jobdata.find("Job_Name").text
-    job["state"] = jobdata.find("job_state").text  # ['Q', 'H', 'R', 'E', 'C']
-    job["queue"] = jobdata.find("queue").text  # 'single_core', 'smp', 'mpi', 'gpu'
+    resources = resources or _resources
+    job = new_job(resources)
+    job["jobid"] = job_id(fields["Job_Id"])
+    job["jobname"] = fields["Job_Name"]
+    job["owner"] = job_owner(fields["Job_Owner"])
+    job["state"] = fields["job_state"]  # ['Q', 'H', 'R', 'E', 'C']
+    job["queue"] = fields["queue"]  # 'single_core', 'smp', 'mpi', 'gpu'
 
     if job["state"] in ("E", "C"):
-        job["exit_status"] = get_elem_text(jobdata, "exit_status")
+        job["exit_status"] = fields["exit_status"]
 
-    # get the available resources
-    avail = jobdata.find("Resource_List")
-    if avail is not None:
-        job["mem"]["avail"] = convert_mem(get_elem_text(avail, "mem"))
-        job["walltime"]["avail"] = convert_time(get_elem_text(avail, "walltime"))
-        job["nodes"] = get_elem_text(jobdata, "Resource_List/nodes")
+    for timestamp in TIMESTAMPS:
+        job[timestamp] = convert_timestamp(fields[timestamp])
 
-    # get the used resources:
+    job["nodes"] = fields["Resource_List/nodes"]
     if job["state"] in ("R", "E", "C"):
-        used = jobdata.find("resources_used")
-        if used is not None:
-            job["mem"]["used"] = convert_mem(get_elem_text(used, "mem"))
-            job["walltime"]["used"] = convert_time(get_elem_text(used, "walltime"))
-            job["cput"] = convert_time(get_elem_text(used, "cput"))
+        job["cput"] = convert_time(fields["resources_used/cput"])
 
-    # calculate number of available cores
-    if job["queue"] == "single_core" or job["nodes"] is None:
-        job["ncore"]["avail"] = 1
-        ppn_list = nodes_list = [1]
-    else:
-        job["ncore"]["avail"] = 0
-        ppn_list = nodes_list = [1]
-        # parse all possible ways nodes and cores can be requested
-        # examples: '1:ppn=8+1:ppn=8' 'nic66:ppn=5+nic67:ppn=5' '1:ppn=8:enc8+1:ppn=8:enc8' '1:4' '1'
-        for nodecore in job["nodes"].split("+"):
-            nodecore = nodecore.split(":")
-            node = nodecore[0]
-            try:
-                core = nodecore[1]
-            except IndexError:
-                core = "1"
-            try:
-                nnode = int(node)
-            except ValueError:
-                nnode = 1
-            ppn = int(core.strip("ppn="))
-            nodes_list.append(nnode)
-            ppn_list.append(ppn)
-            job["ncore"]["avail"] += nnode * ppn
-
-    # calculate number of used cores
-    if job["state"] in ("R", "E", "C"):
-        if job["cput"] and job["walltime"]["used"] is not None:
-            job["ncore"]["used"] = job["cput"] / job["walltime"]["used"]
+    # get the available and used resources, see RESOURCES
+    return resources.extract_resources(job, fields)
 
-    return job
+
+def parse_xml(jobdata):
+    """
+    parse an xml sub-tree containing data of 1 job
+    returns: job dictionary
+    """
+    resources = _resources
+    return build_job(extract_fields(jobdata, resources.fields), resources)
 
 
-def calc_usage(job):
-    """ calculate resource usage """
+def iter_jobdata(source):
+    """
+    iterate over the xml sub-trees of all jobs in the output of 'qstat -xt'
+    source: xml file name or file object
+    each sub-tree is discarded after use, so memory does not grow with the number of jobs
+    """
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag == "Job":
+            yield elem
+            root.clear()
+
+
+def iter_xml_fields(source, owners=None, fields=XML_FIELDS):
+    """
+    iterate over the fields of all jobs in the output of 'qstat -xt' with ElementTree
+    source: xml file name or file object
+    owners: only jobs of given owners, checked before extracting the other fields
+    fields: xml paths to extract
+    """
+    for jobdata in iter_jobdata(source):
+        if owners and job_owner(get_elem_text(jobdata, "Job_Owner")) not in owners:
+            continue
+        yield extract_fields(jobdata, fields)
+
+
+ENGINES = {
+    "etree": iter_xml_fields,
+    "fast": iter_fast_fields,
+}
+
+
+def iter_job_fields(source, engine="etree", owners=None, resources=None):
+    """
+    iterate over the fields of all jobs in the output of 'qstat -xt':
+    the XML_FIELDS and the xml paths of the resources
+    source: xml file name or file object
+    engine: xml parser engine, one of ENGINES
+    owners: only jobs of given owners
+    resources: compiled ResourceSet (default: the enabled resources)
+    """
+    return ENGINES[engine](source, owners=owners, fields=(resources or _resources).fields)
+
+
+def iter_jobs(source, jobids=None, states=None, engine="etree", owners=None, filters=None, resources=None):
+    """
+    iterate over the jobs in the output of 'qstat -xt', with calculated resource usage
+    source: xml file name or file object
+    jobids: show only jobs with given jobIDs
+    states: show only jobs with given states
+    engine: xml parser engine, one of ENGINES
+    owners: show only jobs of given owners
+    filters: show only jobs matching a compiled filter expression (JobFilter)
+    resources: compiled ResourceSet (default: the enabled resources)
+    """
+    resources = resources or _resources
+    job_fields = iter_job_fields(source, engine=engine, owners=owners, resources=resources)
+    return select_jobs(job_fields, jobids=jobids, states=states, filters=filters, resources=resources)
+
+
+def iter_snapshot(filename, jobids=None, states=None, engine="etree", owners=None, filters=None, resources=None):
+    """
+    iterate over the jobs with calculated resource usage in an xml file or snapshot archive
+    jobids: show only jobs with given jobIDs
+    states: show only jobs with given states
+    engine: xml parser engine, one of ENGINES
+    owners: show only jobs of given owners, using the owner index of snapshot archives
+    filters: show only jobs matching a compiled filter expression (JobFilter)
+    resources: compiled ResourceSet for xml files (default: the enabled resources), archives have the RESLIST resources
+    """
+    if is_archive(filename):
+        jobs = iter_archive(filename, owners=owners)
+        return (
+            job
+            for job in jobs
+            if match_job(job, jobids=jobids, states=states) and (filters is None or filters.match(job))
+        )
+    return iter_jobs(
+        filename, jobids=jobids, states=states, engine=engine, owners=owners, filters=filters, resources=resources
+    )
+
+
+def select_jobs(job_fields, jobids=None, states=None, filters=None, resources=None):
+    """
+    build the jobs from their xml fields, and calculate the resource usage of the selected jobs
+    jobids: show only jobs with given jobIDs
+    states: show only jobs with given states
+    filters: show only jobs matching a compiled filter expression (JobFilter),
+             the conditions on raw fields are checked before the job is built
+    resources: compiled ResourceSet that the fields were extracted for (default: the enabled resources)
+    """
+    resources = resources or _resources
+    for fields in job_fields:
+        if filters is not None and not filters.match_fields(fields):
+            continue
+        job = build_job(fields, resources)
+        if match_job(job, jobids=jobids, states=states):
+            job = calc_usage(job, resources)
+            if filters is None or filters.match_job(job):
+                yield job
+
+
+def match_job(job, jobids=None, states=None):
+    """ check if a job has one of the given jobIDs and states (if any) """
+    if jobids and job["jobid"] not in jobids:
+        return False
+    if states and job["state"] not in states:
+        return False
+    return True
+
+
+def calc_usage(job, resources=None):
+    """
+    calculate resource usage, see RESOURCES
+    resources: compiled ResourceSet that the job was built with (default: the enabled resources)
+    """
+    return (resources or _resources).calc_resources(job)
+
+
+def new_aggregate():
+    """ generate a new aggregate of the resource usage of a group of jobs """
+    return {"jobs": 0, "avail": dict.fromkeys(RESLIST, 0.0), "used": dict.fromkeys(RESLIST, 0.0)}
 
+
+def aggregate_job(aggr, job):
+    """
+    add a job to an aggregate
+    resources are only summed if both the available and used amount are known, so used / avail is the efficiency
+    """
+    aggr["jobs"] += 1
     for res in RESLIST:
         if None not in (job[res]["avail"], job[res]["used"]):
-            usage = 100.0 * job[res]["used"] / job[res]["avail"]
-            job[res]["usage"] = round(usage)
-            # do not show ncore usage if used walltime < WAITTIME
-            # None is smaller than any number
-            if res == "ncore" and job["walltime"]["used"] < WAITTIME:
-                job[res]["usage"] = None
-            job[res]["usage_for_free"] = 100.0 * FOR_FREE[res] / job[res]["avail"]
-            if res == "mem":
-                job[res]["usage_for_free"] *= job["ncore"]["avail"]
+            aggr["avail"][res] += job[res]["avail"]
+            aggr["used"][res] += job[res]["used"]
 
-    return job
+
+def merge_aggregate(aggr, other):
+    """ add the jobs of another aggregate to an aggregate """
+    aggr["jobs"] += other["jobs"]
+    for field in ["avail", "used"]:
+        for res in RESLIST:
+            aggr[field][res] += other[field][res]
 
 
 def usage_bar(usage, usage_for_free=0.0, lev=(50, 75, 95), show_rating=True, empty_bar=False, maxlen=20, colors=True):
@@ -239,21 +492,14 @@ def usage_string(job, colors=True):
     """ write memory, walltime, and ncore usage to stdout """
 
     jobstr = " ".join([job["jobid"].rjust(13), job["state"], job["jobname"],])
-    res_extrastrings = dict(zip(RESLIST, [jobstr, "", ""]))
-    fresource = dict(
-        zip(
-            RESLIST,
-            [
-                {"avail": "%10.1f", "used": "%10.1f"},
-                {"avail": "%10.1f", "used": "%10.1f"},
-                {"avail": "%s  ", "used": "%10.1f"},
-            ],
-        )
-    )
+    reslist = _resources.names
+    res_extrastrings = dict.fromkeys(reslist, "")
+    res_extrastrings[reslist[0]] = jobstr
 
-    res_fullstrings = dict.fromkeys(RESLIST, "")
+    res_fullstrings = dict.fromkeys(reslist, "")
 
-    for res in RESLIST:
+    for res in reslist:
+        resource = RESOURCES[res]
         empty_bar = False
         show_rating = True
         usage_for_free = job[res]["usage_for_free"]
@@ -262,9 +508,9 @@ def usage_string(job, colors=True):
         a_ustr = dict.fromkeys(a_ulist, "-  ")
         for a_u in a_ulist:
             if job[res][a_u] is not None:
-                a_ustr[a_u] = fresource[res][a_u] % job[res][a_u]
+                a_ustr[a_u] = resource["%s_format" % a_u] % job[res][a_u]
 
-        if res == "walltime" and job["state"] == "R":
+        if not resource["rate_running"] and job["state"] == "R":
             show_rating = False
 
         usagestr = "- "
@@ -277,35 +523,37 @@ def usage_string(job, colors=True):
             empty_bar=empty_bar,
             colors=colors,
             show_rating=show_rating,
-            lev=LEVELS[res],
+            lev=resource["levels"],
         )
 
         res_fullstrings[res] = " ".join(
             [
-                RES_NAMES[res].rjust(12),
+                resource["title"].rjust(12),
                 a_ustr["used"].rjust(10),
-                UNITS[res].rjust(2),
+                resource["unit"].rjust(2),
                 a_ustr["avail"].rjust(10),
-                UNITS[res].rjust(2),
+                resource["unit"].rjust(2),
                 usagestr.rjust(6),
                 ubar.rjust(31),
                 res_extrastrings[res],
             ]
         )
 
-    return "\n".join(res_fullstrings[res] for res in RESLIST)
+    return "\n".join(res_fullstrings[res] for res in reslist)
 
 
-def csv_string(job):
+def csv_string(job, extra=None):
     full_list = [
         job["jobid"],
         job["state"],
         job["jobname"],
     ]
-    for res in RESLIST:
+    for res in _resources.names:
         full_list.extend(
             [job[res]["avail"], job[res]["used"],]
         )
+    if extra:
+        full_list.extend(extra)
     csvstring = StringIO()
     writer = csv.writer(csvstring)
     writer.writerow(full_list)
@@ -321,56 +569,79 @@ def write_string(string):
 
 
 def alert_mem(job):
-    if job["mem"]["usage"] > LEVELS["mem"][2]:
+    alerts = []
+    levels = RESOURCES["mem"]["levels"]
+    if job["mem"]["usage"] > levels[2]:
         alert = (
             "Alert: memory close to the limit (%.0f %%). "
             "If your job failed, request more memory." % job["mem"]["usage"]
         )
-        print(alert)
-    if max(job["mem"]["usage"], job["mem"]["usage_for_free"]) < LEVELS["mem"][0]:
+        alerts.append(alert)
+    if max(job["mem"]["usage"], job["mem"]["usage_for_free"]) < levels[0]:
         alert = (
-            "Alert: only %.1f gb of the requested %.1f gb memory used. "
-            "Please request less memory to avoid wasting resources." % (job["mem"]["used"], job["mem"]["avail"])
+            "Alert: only %.1f %s of the requested %.1f %s memory used. "
+            "Please request less memory to avoid wasting resources."
+            % (job["mem"]["used"], RESOURCES["mem"]["unit"], job["mem"]["avail"], RESOURCES["mem"]["unit"])
         )
-        print(alert)
+        alerts.append(alert)
+    return alerts
 
 
 def alert_walltime(job):
-    if job["walltime"]["usage"] > LEVELS["walltime"][2]:
+    alerts = []
+    if job["walltime"]["usage"] > RESOURCES["walltime"]["levels"][2]:
         alert = (
             "Alert: walltime close to the limit (%.0f %%). "
             "If your job failed, request more walltime." % job["walltime"]["usage"]
         )
-        print(alert)
+        alerts.append(alert)
+    return alerts
 
 
 def alert_ncore(job):
+    alerts = []
     if job["ncore"]["usage"] is None:
-        return
-    if job["ncore"]["avail"] > 1 and job["ncore"]["usage"] + job["ncore"]["usage_for_free"] < LEVELS["ncore"][0]:
+        return alerts
+    usage = job["ncore"]["usage"] + job["ncore"]["usage_for_free"]
+    if job["ncore"]["avail"] > 1 and usage < RESOURCES["ncore"]["levels"][0]:
         alert = (
             "Alert: only %.1f of the requested %d cores used. "
             "Please request less cores or make sure your program uses all cores to avoid wasting resources."
             % (job["ncore"]["used"], job["ncore"]["avail"])
         )
-        print(alert)
+        alerts.append(alert)
+    return alerts
 
 
 def alert_exit(job):
+    alerts = []
     if job["exit_status"] not in ("0", None):
         alert = "Alert: job stopped with non-zero exit code (%s)." % job["exit_status"]
-        print(alert)
+        alerts.append(alert)
+    return alerts
 
 
-def write_alerts(job):
-    alerts = {"mem": alert_mem, "walltime": alert_walltime, "ncore": alert_ncore}
-    # Todo: this wrongly assumed that the order of keys in a dict is fixed
-    # I've replace it with a list of the order it expects to not break any tests
-    for res in ["mem", "walltime", "ncore"]:
-        if job[res]["usage"] is not None:
-            alerts[res](job)
+# alert functions of the resources, in the order of the alerts
+RESOURCE_ALERTS = [("mem", alert_mem), ("walltime", alert_walltime), ("ncore", alert_ncore)]
+
+
+def get_alerts(job):
+    """
+    get the alert messages of a job with calculated resource usage, as a list of strings
+    there are only alerts for the resources in the job
+    """
+    messages = []
+    for res, alert in RESOURCE_ALERTS:
+        if res in job and job[res]["usage"] is not None:
+            messages.extend(alert(job))
     if job["exit_status"] is not None:
-        alert_exit(job)
+        messages.extend(alert_exit(job))
+    return messages
+
+
+def write_alerts(job):
+    for alert in get_alerts(job):
+        print(alert)
 
 
 def write_header():
@@ -379,19 +650,10 @@ def write_header():
     print(fstring % ("--------", "----", "---------", "-----", " ", "-----", "-", "-------"))
 
 
-def write_header_csv():
-    print(
-        ",".join(
-            [
-                "jobID",
-                "state",
-                "jobname",
-                "walltime_avail",
-                "walltime_used",
-                "mem_avail",
-                "mem_used",
-                "ncore_avail",
-                "ncore_used",
-            ]
-        )
-    )
+def write_header_csv(extra=None):
+    header = ["jobID", "state", "jobname"]
+    for res in _resources.names:
+        header.extend(["%s_avail" % res, "%s_used" % res])
+    if extra:
+        header.extend(extra)
+    print(",".join(header))
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test library api
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+from vsc.install.testing import TestCase
+from vsc.myresources.api import JobCache, iter_records
+from vsc.myresources.archive import write_archive
+from vsc.myresources.utils import MyResourcesError, convert_mem, get_alerts, iter_jobs, resource_set
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_alerts(filename):
+    """ alert lines in a reference output, per job """
+    alerts = [[]]
+    with open(filename) as fih:
+        for line in fih.readlines()[2:]:
+            if line.startswith("Alert:"):
+                alerts[-1].append(line.rstrip("\n"))
+            elif not line.strip():
+                alerts.append([])
+    return alerts[:-1]
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_sources(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobs = list(iter_jobs(xmlfile))
+        archive = os.path.join(self.tmpdir, "snapshot.myra")
+        write_archive(iter(jobs), archive)
+        self.assertEqual(list(iter_records(xmlfile)), jobs)
+        self.assertEqual(list(iter_records(xmlfile, engine="fast")), jobs)
+        self.assertEqual(list(iter_records(archive)), jobs)
+        with open(xmlfile, "rb") as fih:
+            self.assertEqual(list(iter_records(fih)), jobs)
+        self.assertEqual(list(iter_records(xmlfile, states=["Q"])), [job for job in jobs if job["state"] == "Q"])
+        # the resources are given per call, and compiled once
+        self.assertTrue(resource_set(["vmem"]) is resource_set(("vmem",)))
+        for job in iter_records(xmlfile, resources=["vmem"]):
+            self.assertEqual(sorted(res for res in ["walltime", "mem", "ncore", "vmem"] if res in job), ["vmem"])
+
+    def test_alerts(self):
+        for i in range(1, 19):
+            jobs = list(iter_records(os.path.join(TEST_DIR, "qstat_xml", "qstat%s.xml" % i), alerts=True))
+            alerts = read_alerts(os.path.join(TEST_DIR, "ref_output", "qstat%s.out" % i))
+            self.assertEqual([job["alerts"] for job in jobs], alerts, "test %d failed" % i)
+            self.assertEqual([get_alerts(job) for job in jobs], alerts)
+
+    def test_errors(self):
+        self.assertRaises(MyResourcesError, convert_mem, "10pb")
+        self.assertRaises(ValueError, convert_mem, "10pb")
+        self.assertRaises(IOError, list, iter_records(os.path.join(self.tmpdir, "missing.xml")))
+
+    def test_cache(self):
+        xmlfile = os.path.join(self.tmpdir, "qstat.xml")
+        shutil.copy(os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml"), xmlfile)
+        cache = JobCache(xmlfile, interval=3600)
+        jobs = cache.jobs()
+        self.assertEqual(len(jobs), 105)
+        self.assertEqual(len(cache.jobs(states=["Q"])), 31)
+        self.assertEqual(cache.jobs(owners=["nobody"]), [])
+        owners = sorted(set(job["owner"] for job in jobs))[:2]
+        self.assertEqual(cache.jobs(owners=owners), [job for job in cache.jobs() if job["owner"] in owners])
+
+        # records are copies
+        jobs[0]["mem"]["used"] = -1
+        self.assertNotEqual(cache.jobs()[0]["mem"]["used"], -1)
+
+        # the source is only read again after the interval
+        shutil.copy(os.path.join(TEST_DIR, "qstat_xml", "qstat1.xml"), xmlfile)
+        self.assertEqual(len(cache.jobs()), 105)
+        cache.clear()
+        self.assertEqual(len(cache.jobs()), len(list(iter_records(xmlfile))))
+
+        results = []
+
+        def worker():
+            results.append(cache.jobs())
+
+        cache.clear()
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertEqual(result, results[0])
+
+        # a file object is only read once
+        with open(xmlfile, "rb") as fih:
+            stream_cache = JobCache(fih, interval=0)
+        self.assertEqual(len(stream_cache.jobs()), len(list(iter_records(xmlfile))))
+        self.assertEqual(stream_cache.jobs(), stream_cache.jobs())
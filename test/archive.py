@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test columnar snapshot archive
+"""
+
+import os
+import shutil
+import tempfile
+
+from vsc.install.testing import TestCase
+from vsc.myresources.archive import (
+    ARCHIVE_VERSION,
+    HEADER,
+    MAGIC,
+    Archive,
+    ArchiveError,
+    is_archive,
+    iter_archive,
+    write_archive,
+)
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmpdir, "snapshot.myra")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        for i in range(1, 19):
+            xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat%s.xml" % i)
+            jobs = list(iter_jobs(xmlfile))
+            self.assertEqual(write_archive(iter(jobs), self.archive), len(jobs))
+            self.assertTrue(is_archive(self.archive))
+            self.assertEqual(os.stat(self.archive).st_mode & 0o777, 0o644)
+            self.assertFalse(is_archive(xmlfile))
+            self.assertEqual(list(iter_archive(self.archive)), jobs, "test %d failed" % i)
+
+    def test_find_column(self):
+        jobs = list(iter_jobs(os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")))
+        write_archive(iter(jobs), self.archive)
+        with Archive(self.archive) as archive:
+            self.assertEqual(len(archive), len(jobs))
+            for job in jobs:
+                self.assertEqual(archive.find(job["jobid"]), job)
+            self.assertEqual(archive.find("1"), None)
+            column = archive.column("ncore_avail")
+            self.assertEqual(list(column), [job["ncore"]["avail"] for job in jobs])
+            # closing does not fail while the caller holds views of a column
+            part = column[:10]
+        self.assertEqual(len(part), 10)
+
+    def test_owners(self):
+        jobs = []
+        for i in range(1, 19):
+            jobs.extend(iter_jobs(os.path.join(TEST_DIR, "qstat_xml", "qstat%s.xml" % i)))
+        write_archive(iter(jobs), self.archive)
+        owners = sorted(set(job["owner"] for job in jobs))
+        self.assertTrue(len(owners) > 1)
+        archive = Archive(self.archive)
+        try:
+            for owner in owners:
+                rows = archive.owner_rows(owner)
+                self.assertEqual([archive.job(row) for row in rows], [job for job in jobs if job["owner"] == owner])
+            self.assertEqual(archive.owner_rows("nobody"), [])
+        finally:
+            archive.close()
+        selected = list(iter_archive(self.archive, owners=owners[:2]))
+        self.assertEqual(selected, [job for job in jobs if job["owner"] in owners[:2]])
+
+    def test_empty(self):
+        self.assertEqual(write_archive(iter([]), self.archive), 0)
+        self.assertEqual(list(iter_archive(self.archive)), [])
+
+    def test_version(self):
+        write_archive(iter([]), self.archive)
+        with open(self.archive, "r+b") as fih:
+            metasize = HEADER.unpack(fih.read(HEADER.size))[2]
+            fih.seek(0)
+            fih.write(HEADER.pack(MAGIC, ARCHIVE_VERSION + 1, metasize))
+        self.assertRaises(ArchiveError, Archive, self.archive)
+
+    def test_truncated(self):
+        write_archive(iter_jobs(os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")), self.archive)
+        with open(self.archive, "rb") as fih:
+            data = fih.read()
+        truncated = os.path.join(self.tmpdir, "truncated.myra")
+        for size in [4, 8, HEADER.size, 100, 3000, len(data) - 1]:
+            with open(truncated, "wb") as fih:
+                fih.write(data[:size])
+            self.assertRaises(ArchiveError, Archive, truncated)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test batch replay of snapshot files
+"""
+
+import os
+import shutil
+import tempfile
+
+from vsc.install.testing import TestCase
+from vsc.myresources.batch import (
+    merge_summaries,
+    new_summary,
+    snapshot_files,
+    summarize_files,
+    summarize_snapshot,
+    summary_totals,
+)
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class BatchTest(TestCase):
+    def setUp(self):
+        self.filenames = snapshot_files(os.path.join(TEST_DIR, "qstat_xml", "qstat*.xml"))
+
+    def test_snapshot_files(self):
+        self.assertEqual(len(self.filenames), 18)
+        self.assertEqual(snapshot_files(os.path.join(TEST_DIR, "qstat_xml")), sorted(
+            os.path.join(TEST_DIR, "qstat_xml", name) for name in os.listdir(os.path.join(TEST_DIR, "qstat_xml"))))
+
+    def test_merge(self):
+        partials = [summarize_snapshot(filename) for filename in self.filenames]
+        forward = new_summary()
+        for partial in partials:
+            merge_summaries(forward, partial)
+        backward = new_summary()
+        for partial in reversed(partials):
+            merge_summaries(backward, partial)
+        self.assertEqual(forward, backward)
+        self.assertEqual(forward["files"], 18)
+        totals = summary_totals(forward)
+        self.assertEqual(totals, summary_totals(backward))
+        self.assertEqual(totals["jobs"], len(forward["jobs"]))
+        self.assertEqual(totals["jobs"], sum(totals["states"].values()))
+        self.assertEqual(totals["jobs"], sum(aggr["jobs"] for aggr in totals["owners"].values()))
+
+        summary, _ = summarize_files(self.filenames, processes=2)
+        self.assertEqual(summary, forward)
+
+        summary, _ = summarize_files(self.filenames, states=["Q"], engine="fast", processes=1)
+        queued = set(job["jobid"] for filename in self.filenames for job in iter_jobs(filename) if job["state"] == "Q")
+        self.assertEqual(set(summary["jobs"]), queued)
+
+        # the filter expression is compiled in each worker
+        serial, _ = summarize_files(self.filenames, expression="state==Q or mem.usage<30", processes=1)
+        summary, _ = summarize_files(self.filenames, expression="state==Q or mem.usage<30", processes=2)
+        self.assertEqual(summary, serial)
+        self.assertTrue(len(queued) < len(serial["jobs"]) < totals["jobs"])
+
+        summary, _ = summarize_files(self.filenames, jobids=["1257508[2]", "1254168"], processes=2)
+        self.assertEqual(sorted(summary["jobs"]), ["1254168", "1257508[2]"])
+
+    def test_overlap(self):
+        # qstat7.xml and qstat8.xml are consecutive snapshots of the same jobs
+        first = os.path.join(TEST_DIR, "qstat_xml", "qstat7.xml")
+        second = os.path.join(TEST_DIR, "qstat_xml", "qstat8.xml")
+        summary, _ = summarize_files([first, second], processes=2)
+        self.assertEqual(summary["files"], 2)
+        self.assertEqual(sorted(summary["jobs"]), sorted(job["jobid"] for job in iter_jobs(second)))
+        # each job is counted once, with its latest observation
+        self.assertEqual(summary_totals(summary), summary_totals(summarize_snapshot(second)))
+
+    def test_failed(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            broken = os.path.join(tmpdir, "broken.xml")
+            with open(broken, "w") as fih:
+                fih.write("<Data><Job>")
+            truncated = os.path.join(tmpdir, "truncated.myra")
+            with open(truncated, "wb") as fih:
+                fih.write(b"MYRA\x01\x00")
+            summary, _ = summarize_files(self.filenames[:1] + [broken, truncated], processes=2)
+            self.assertEqual(summary["files"], 1)
+            self.assertEqual(sorted(filename for filename, _ in summary["failed"]), [broken, truncated])
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+benchmark of the xml parser engines and snapshot archives
+
+usage: python test/benchmark.py [-n COPIES] [xmlfile ...]
+the jobs of the given files (default: all test/qstat_xml files) are copied COPIES times
+into one large snapshot, which is then parsed with each engine, and read from a snapshot archive
+"""
+
+from __future__ import division, print_function
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from io import BytesIO
+
+from vsc.myresources.archive import Archive, iter_archive, write_archive
+from vsc.myresources.utils import ENGINES, iter_job_fields, iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_snapshot(xmlfiles, copies):
+    """ concatenate the jobs of the given xml files copies times """
+    jobs = []
+    for xmlfile in xmlfiles:
+        with open(xmlfile, "rb") as fih:
+            jobs.extend(re.findall(b"<Job>.*?</Job>", fih.read(), re.S))
+    return b'<?xml version="1.0"?>\n<Data>' + b"".join(jobs * copies) + b"</Data>", len(jobs) * copies
+
+
+def timeit(func, data):
+    start = time.time()
+    njobs = sum(1 for _ in func(BytesIO(data)))
+    return njobs, time.time() - start
+
+
+def main():
+    parser = ArgumentParser(description="benchmark of the xml parser engines")
+    parser.add_argument("xmlfiles", nargs="*", help="xml files (output of 'qstat -xt')")
+    parser.add_argument("-n", "--copies", type=int, default=50, help="number of copies of the jobs (default: 50)")
+    args = parser.parse_args()
+
+    xmlfiles = args.xmlfiles
+    if not xmlfiles:
+        xml_dir = os.path.join(TEST_DIR, "qstat_xml")
+        xmlfiles = [os.path.join(xml_dir, name) for name in sorted(os.listdir(xml_dir)) if name.startswith("qstat")]
+
+    data, njobs = make_snapshot(xmlfiles, args.copies)
+    print("snapshot: %d jobs, %.1f MB" % (njobs, len(data) / 2 ** 20))
+    print("%-8s %-22s %10s %12s" % ("engine", "stage", "time (s)", "jobs/s"))
+    for engine in sorted(ENGINES):
+        stages = [
+            ("extract fields", lambda source: iter_job_fields(source, engine=engine)),
+            ("parse + calc_usage", lambda source: iter_jobs(source, engine=engine)),
+        ]
+        for stage, func in stages:
+            count, elapsed = timeit(func, data)
+            if count != njobs:
+                sys.stderr.write("Error: engine %s found %d of %d jobs\n" % (engine, count, njobs))
+                sys.exit(1)
+            print("%-8s %-22s %10.3f %12.0f" % (engine, stage, elapsed, count / elapsed))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        archive = os.path.join(tmpdir, "snapshot.myra")
+        write_archive(iter_jobs(BytesIO(data), engine="fast"), archive)
+        start = time.time()
+        count = sum(1 for _ in iter_archive(archive))
+        elapsed = time.time() - start
+        print("%-8s %-22s %10.3f %12.0f" % ("archive", "read jobs", elapsed, count / elapsed))
+        start = time.time()
+        with Archive(archive) as snapshot:
+            sum(a - u for a, u in zip(snapshot.column("ncore_avail"), snapshot.column("ncore_used")) if u == u)
+        elapsed = time.time() - start
+        print("%-8s %-22s %10.3f %12.0f" % ("archive", "scan ncore columns", elapsed, count / elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test snapshot diff
+"""
+
+import os
+
+from vsc.install.testing import TestCase
+from vsc.myresources.diff import ADDED, CHANGED, REMOVED, diff_jobs, index_jobs
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def xml_file(name):
+    return os.path.join(TEST_DIR, "qstat_xml", name)
+
+
+class DiffTest(TestCase):
+    def test_identical_snapshots(self):
+        old_index = index_jobs(iter_jobs(xml_file("qstat7.xml")))
+        changes = list(diff_jobs(old_index, iter_jobs(xml_file("qstat7.xml"))))
+        self.assertEqual(changes, [])
+
+    def test_consecutive_snapshots(self):
+        old_index = index_jobs(iter_jobs(xml_file("qstat7.xml")))
+        changes = list(diff_jobs(old_index, iter_jobs(xml_file("qstat8.xml"))))
+        running = [job["jobid"] for job in old_index.values() if job["state"] == "R"]
+        self.assertEqual([new["jobid"] for _, _, new, _ in changes], running)
+        for change, old, new, delta in changes:
+            self.assertEqual(change, CHANGED)
+            self.assertEqual((old["state"], new["state"]), ("R", "C"))
+            self.assertEqual(delta["ncore"]["avail"], 0)
+
+    def test_added_removed(self):
+        old_index = index_jobs(iter_jobs(xml_file("qstat1.xml")))
+        new_jobs = list(iter_jobs(xml_file("qstat2.xml")))
+        changes = list(diff_jobs(old_index, iter_jobs(xml_file("qstat2.xml"))))
+        self.assertEqual([c[0] for c in changes], [ADDED] * len(new_jobs) + [REMOVED] * len(old_index))
+        self.assertEqual([c[2]["jobid"] for c in changes if c[0] == ADDED], [job["jobid"] for job in new_jobs])
+        self.assertEqual([c[1]["jobid"] for c in changes if c[0] == REMOVED], list(old_index))
+
+    def test_select(self):
+        # jobs are matched by job ID before they are selected, in either snapshot
+        old_index = index_jobs(iter_jobs(xml_file("qstat7.xml")))
+        changes = list(diff_jobs(old_index, iter_jobs(xml_file("qstat8.xml"))))
+        for states in [["R"], ["C"]]:
+            selected = list(
+                diff_jobs(old_index, iter_jobs(xml_file("qstat8.xml")), select=lambda job: job["state"] in states)
+            )
+            self.assertEqual(selected, changes)
+        self.assertEqual(list(diff_jobs(old_index, iter_jobs(xml_file("qstat8.xml")), select=lambda job: False)), [])
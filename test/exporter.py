@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test OpenMetrics exporter
+"""
+
+import os
+import re
+import shutil
+import tempfile
+
+from vsc.install.testing import TestCase
+from vsc.myresources.exporter import OTHER_OWNER, collect_metrics, write_textfile
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_RE = re.compile(r'^([a-z_]+)\{((?:[a-z]+="[^"]*",?)+)\} (\S+)$')
+
+
+def parse_metrics(metrics):
+    """ parse OpenMetrics text into a list of (name, labels, value) """
+    samples = []
+    lines = metrics.splitlines()
+    assert lines[-1] == "# EOF"
+    for line in lines[:-1]:
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE_RE.match(line).groups()
+        samples.append((name, dict(re.findall(r'([a-z]+)="([^"]*)"', labels)), float(value)))
+    return samples
+
+
+class ExporterTest(TestCase):
+    def test_collect_metrics(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat2.xml")
+        jobs = list(iter_jobs(xmlfile))
+        samples = parse_metrics(collect_metrics(iter(jobs)))
+
+        used = dict(((s[1]["jobid"], s[1]["resource"]), s[2]) for s in samples if s[0] == "myresources_job_used")
+        for job in jobs:
+            if job["mem"]["used"] is not None:
+                self.assertAlmostEqual(used[(job["jobid"], "mem")], job["mem"]["used"])
+
+        njobs = [s for s in samples if s[0] == "myresources_jobs"]
+        self.assertEqual(sum(s[2] for s in njobs), len(jobs))
+        owners = set(s[1]["owner"] for s in samples if s[0] == "myresources_owner_jobs")
+        self.assertEqual(owners, set(job["owner"] for job in jobs))
+
+    def test_max_owners(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat2.xml")
+        jobs = list(iter_jobs(xmlfile))
+        for i, job in enumerate(jobs):
+            job["owner"] = "vsc1000%d" % (i % 3)
+        samples = parse_metrics(collect_metrics(iter(jobs), max_owners=1))
+        counts = {}
+        for name, labels, value in samples:
+            if name == "myresources_owner_jobs":
+                counts[labels["owner"]] = counts.get(labels["owner"], 0) + value
+        self.assertEqual(len(counts), 2)
+        self.assertTrue(OTHER_OWNER in counts)
+        self.assertEqual(sum(counts.values()), len(jobs))
+
+    def test_write_textfile(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            write_textfile("# EOF\n", tmpdir)
+            write_textfile("# EOF\n", tmpdir)
+            self.assertEqual(os.listdir(tmpdir), ["myresources.prom"])
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,157 @@
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+differential test of the fast xml parser engine against ElementTree
+"""
+
+import getpass
+import os
+import random
+from io import BytesIO
+
+from vsc.install.testing import TestCase
+from vsc.myresources.resources import RESOURCES, resource_fields
+from vsc.myresources.utils import build_job, enable_resources, iter_job_fields, select_owners
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FUZZ_JOBS = 500
+FUZZ_VALUES = {
+    "Job_Id": ["1251253", "1257508[2]", "1257509[]", "2602144.master01.hydra.brussel.vsc"],
+    "Job_Name": ["STDIN", "moles.pbs", "a&amp;b", "&lt;job&gt;", "x&#233;y", "&#x263A;", "caf\xc3\xa9", "a\r\nb", " "],
+    "Job_Owner": ["smoors@nic49.usr.hydra.brussel.vsc", "vsc10000@login1", "vsc10000"],
+    "job_state": ["Q", "H", "R", "E", "C"],
+    "queue": ["single_core", "smp", "mpi", "gpu"],
+    "exit_status": ["0", "265", "-11"],
+    "Resource_List/mem": ["1gb", "200mb", "31316kb", "2TB"],
+    "Resource_List/walltime": ["01:00:00", "120:00:00", "00:00:30"],
+    "Resource_List/nodes": ["1", "1:ppn=8", "nic66:ppn=5+nic67:ppn=5", "1:ppn=8:enc8+1:ppn=8:enc8", "2:4"],
+    "resources_used/mem": ["31316kb", "0kb", "2gb"],
+    "resources_used/walltime": ["00:15:44", "00:00:01", "99:59:59"],
+    "resources_used/cput": ["00:00:01", "12:00:00"],
+    "Resource_List/vmem": ["4gb", "1073741824b"],
+    "resources_used/vmem": ["135276kb", "0kb"],
+    "resources_used/energy_used": ["0", "12345"],
+    "ctime": ["1550661855", "1550662247"],
+    "qtime": ["1550661855", "1550662247"],
+    "etime": ["1550661855", "1550662300"],
+    "start_time": ["1550662036", "1550662260"],
+    "comp_time": ["1550662054", "1550669999"],
+}
+# elements that the fast parser must skip
+FUZZ_NOISE = [
+    "<Variable_List>PBS_O_QUEUE=&lt;queue&gt;smp&lt;/queue&gt;,PBS_O_HOME=/u/user</Variable_List>",
+    "<server>mn05.usr.hydra.brussel.vsc</server>",
+    "<req_information><task_count.0>1</task_count.0><memory.0>1048576kb</memory.0></req_information>",
+    "<queue_type>E</queue_type>",
+    "<Checkpoint/>",
+]
+
+
+def fuzz_element(tag, value, rng):
+    """ generate an element, possibly empty """
+    choice = rng.random()
+    if tag != "Job_Id" and choice < 0.05:
+        return "<%s/>" % tag
+    if tag != "Job_Id" and choice < 0.1:
+        return "<%s></%s>" % (tag, tag)
+    return "<%s>%s</%s>" % (tag, value, tag)
+
+
+def fuzz_job(rng):
+    """ generate the xml of a job with random fields in random order """
+    elements = list(FUZZ_NOISE)
+    sections = {}
+    for path in resource_fields(RESOURCES):
+        if rng.random() < 0.1 and path != "Job_Id":
+            continue
+        tags = path.split("/")
+        element = fuzz_element(tags[-1], rng.choice(FUZZ_VALUES[path]), rng)
+        if len(tags) == 1:
+            elements.append(element)
+        else:
+            sections.setdefault(tags[0], []).append(element)
+    for parent, children in sections.items():
+        rng.shuffle(children)
+        elements.append("<%s>%s</%s>" % (parent, "".join(children), parent))
+    rng.shuffle(elements)
+    sep = rng.choice(["", "\n    "])
+    return "<Job>%s%s%s</Job>" % (sep, sep.join(elements), sep)
+
+
+class FastParseTest(TestCase):
+    def tearDown(self):
+        enable_resources()
+
+    def assert_same_fields(self, source):
+        """
+        check that both engines extract the same fields and build the same jobs
+        source: function returning a new xml file name or file object
+        """
+        etree_fields = list(iter_job_fields(source()))
+        fast_fields = list(iter_job_fields(source(), engine="fast"))
+        self.assertEqual(etree_fields, fast_fields)
+        self.assertEqual([build_job(f) for f in etree_fields], [build_job(f) for f in fast_fields])
+        return len(fast_fields)
+
+    def test_qstat_xml_files(self):
+        xml_dir = os.path.join(TEST_DIR, "qstat_xml")
+        for filename in sorted(os.listdir(xml_dir)):
+            xmlfile = os.path.join(xml_dir, filename)
+            self.assertTrue(self.assert_same_fields(lambda: xmlfile) > 0, filename)
+
+    def test_fuzz(self):
+        rng = random.Random(42)
+        jobs = [fuzz_job(rng) for _ in range(FUZZ_JOBS)]
+        xmlstring = '<?xml version="1.0"?>\n<Data>%s</Data>' % "".join(jobs)
+        if not isinstance(xmlstring, bytes):
+            # Python 3: FUZZ_VALUES contain utf-8 encoded bytes
+            xmlstring = xmlstring.encode("latin-1")
+        self.assertEqual(self.assert_same_fields(lambda: BytesIO(xmlstring)), FUZZ_JOBS)
+        enable_resources(list(RESOURCES))
+        self.assertEqual(self.assert_same_fields(lambda: BytesIO(xmlstring)), FUZZ_JOBS)
+
+    def test_empty(self):
+        self.assertEqual(self.assert_same_fields(lambda: BytesIO(b"<Data></Data>")), 0)
+
+    def test_owners(self):
+        xml_dir = os.path.join(TEST_DIR, "qstat_xml")
+        for filename in sorted(os.listdir(xml_dir)):
+            xmlfile = os.path.join(xml_dir, filename)
+            jobs = [build_job(f) for f in iter_job_fields(xmlfile)]
+            owners = set(job["owner"] for job in jobs if job["owner"])
+            for owner in owners | set(["nobody"]):
+                expected = [job for job in jobs if job["owner"] == owner]
+                for engine in ("etree", "fast"):
+                    selected = [build_job(f) for f in iter_job_fields(xmlfile, engine=engine, owners=[owner])]
+                    self.assertEqual(selected, expected, "%s %s %s" % (filename, engine, owner))
+
+    def test_select_owners(self):
+        user = getpass.getuser()
+        self.assertEqual(select_owners(), [user])
+        self.assertEqual(select_owners(live=False), None)
+        # jobs requested by jobID are shown whoever owns them
+        self.assertEqual(select_owners(jobids=["1253502"]), None)
+        self.assertEqual(select_owners("vsc10000,smoors", jobids=["1253502"]), ["vsc10000", "smoors"])
+        self.assertEqual(select_owners("all"), None)
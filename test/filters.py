@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test filter expressions
+"""
+
+import os
+import re
+import shutil
+import tempfile
+
+from vsc.install.testing import TestCase
+from vsc.myresources.archive import write_archive
+from vsc.myresources.filters import FilterError, JobFilter, tokenize
+from vsc.myresources.utils import MyResourcesError, iter_job_fields, iter_jobs, iter_snapshot, resource_set
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# filter expressions and the equivalent python predicates
+EXPRESSIONS = [
+    ("queue==smp", lambda job: job["queue"] == "smp"),
+    ("state!=C and mem.usage<30", lambda job: job["state"] != "C" and none_lt(job["mem"]["usage"], 30)),
+    ("queue == 'mpi' and ncore.avail>=16", lambda job: job["queue"] == "mpi" and job["ncore"]["avail"] >= 16),
+    ("state==Q or walltime.used>=10", lambda job: job["state"] == "Q" or none_ge(job["walltime"]["used"], 10)),
+    ("not (state==R or state==C)", lambda job: job["state"] not in ("R", "C")),
+    ('jobname~"^[a-m]" and owner!=smoors', lambda job: "a" <= job["jobname"][:1] <= "m" and job["owner"] != "smoors"),
+    ("nodes~'ppn=[0-9]{2}' and exit_status==0", lambda job: two_digit_ppn(job) and job["exit_status"] == "0"),
+    ("cput>1 and start_time>=1.55e9", lambda job: none_gt(job["cput"], 1) and none_ge(job["start_time"], 1.55e9)),
+    ("jobid==1257508[2] or jobid==1258047", lambda job: job["jobid"] in ("1257508[2]", "1258047")),
+]
+
+
+def two_digit_ppn(job):
+    return re.search("ppn=[0-9]{2}", job["nodes"] or "") is not None
+
+
+def none_lt(value, limit):
+    return value is not None and value < limit
+
+
+def none_gt(value, limit):
+    return value is not None and value > limit
+
+
+def none_ge(value, limit):
+    return value is not None and value >= limit
+
+
+class FiltersTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.jobs = {}
+        for i in range(1, 19):
+            xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat%s.xml" % i)
+            self.jobs[xmlfile] = list(iter_jobs(xmlfile))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize("(mem.usage<30 or queue=='a b')"),
+            [
+                ("paren", "("),
+                ("word", "mem.usage"),
+                ("op", "<"),
+                ("word", "30"),
+                ("word", "or"),
+                ("word", "queue"),
+                ("op", "=="),
+                ("string", "a b"),
+                ("paren", ")"),
+            ],
+        )
+
+    def test_expressions(self):
+        archive = os.path.join(self.tmpdir, "snapshot.myra")
+        for xmlfile, jobs in sorted(self.jobs.items()):
+            write_archive(iter(jobs), archive)
+            for expression, predicate in EXPRESSIONS:
+                jobfilter = JobFilter(expression)
+                expected = [job for job in jobs if predicate(job)]
+                msg = "%s: %s" % (os.path.basename(xmlfile), expression)
+                self.assertEqual(list(iter_jobs(xmlfile, filters=jobfilter)), expected, msg)
+                self.assertEqual(list(iter_jobs(xmlfile, filters=jobfilter, engine="fast")), expected, msg)
+                self.assertEqual(list(iter_snapshot(archive, filters=jobfilter)), expected, msg)
+                self.assertEqual([job for job in jobs if jobfilter.match(job)], expected, msg)
+
+    def test_raw_fields(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobfilter = JobFilter("queue==smp and owner==nlawranc and mem.usage>50")
+        fields = list(iter_job_fields(xmlfile))
+        # the conditions on raw fields are checked before building the job
+        self.assertEqual(
+            [f for f in fields if jobfilter.match_fields(f)],
+            [f for f in fields if f["queue"] == "smp" and f["Job_Owner"].startswith("nlawranc@")],
+        )
+        # the other conditions are checked after calculating the resource usage
+        self.assertTrue(jobfilter.match_job({"mem": {"usage": 60}}))
+        self.assertFalse(jobfilter.match_job({"mem": {"usage": None}}))
+        # or-expressions with derived fields are checked on the job
+        jobfilter = JobFilter("queue==smp or mem.usage>50")
+        self.assertTrue(all(jobfilter.match_fields(f) for f in fields))
+
+    def test_resources(self):
+        # filters on optional resources are false for jobs without them
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobfilter = JobFilter("vmem.used>1")
+        self.assertEqual(list(iter_jobs(xmlfile, filters=jobfilter)), [])
+        resources = resource_set(["walltime", "vmem"])
+        jobs = list(iter_jobs(xmlfile, resources=resources))
+        expected = [job for job in jobs if none_gt(job["vmem"]["used"], 1)]
+        self.assertTrue(expected)
+        self.assertEqual(list(iter_jobs(xmlfile, filters=jobfilter, resources=resources)), expected)
+
+    def test_errors(self):
+        for expression in [
+            "",
+            "queue==",
+            "queue mpi",
+            "foo==1",
+            "mem.usage<abc",
+            "queue<mpi",
+            "(queue==mpi",
+            "queue==mpi)",
+            "queue==mpi and",
+            "queue==mpi state==Q",
+            "jobname~(",
+            "queue==\"mpi",
+        ]:
+            self.assertRaises(FilterError, JobFilter, expression)
+        self.assertTrue(issubclass(FilterError, MyResourcesError))
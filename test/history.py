@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test history store and right-sizing recommendations
+"""
+
+import os
+import shutil
+import tempfile
+
+from vsc.install.testing import TestCase
+from vsc.myresources.constants import HISTORY_SAMPLES, HISTORY_SEEN
+from vsc.myresources.history import (
+    get_recommendation,
+    group_key,
+    load_history,
+    new_history,
+    percentile,
+    resource_list,
+    save_history,
+    update_history,
+)
+from vsc.myresources.utils import calc_usage, new_job
+
+
+def finished_job(jobid, mem, walltime, ncore, jobname="sim.sh", nodes="1:ppn=8", exit_status="0", queue="smp"):
+    job = new_job()
+    job.update(
+        {"jobid": jobid, "jobname": jobname, "owner": "vsc10000", "state": "C", "queue": queue, "nodes": nodes,
+         "exit_status": exit_status}
+    )
+    job["mem"].update({"avail": 16, "used": mem})
+    job["walltime"].update({"avail": 24, "used": walltime})
+    job["ncore"].update({"avail": 8, "used": ncore})
+    return calc_usage(job)
+
+
+class HistoryTest(TestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 95), 5)
+        self.assertEqual(percentile([7], 0), 7)
+
+    def test_group_key(self):
+        self.assertEqual(group_key(finished_job("12[3]", 1, 1, 1, jobname="sim.sh-3")),
+                         group_key(finished_job("12[4]", 1, 1, 1, jobname="sim.sh-4")))
+        self.assertNotEqual(group_key(finished_job("12", 1, 1, 1)),
+                            group_key(finished_job("13", 1, 1, 1, nodes="1:ppn=4")))
+
+    def test_update_history(self):
+        history = new_history()
+        jobs = [finished_job(str(i), mem=2.0 + i / 10.0, walltime=1.0 + i / 10.0, ncore=1.5) for i in range(2)]
+        self.assertEqual(update_history(history, jobs), 2)
+        self.assertEqual(get_recommendation(history, jobs[0]), None)
+
+        # the same jobs are not added again, failed jobs are not added at all
+        jobs.append(finished_job("2", mem=2.2, walltime=3.7, ncore=1.5))
+        jobs.append(finished_job("3", mem=99, walltime=1, ncore=8, exit_status="271"))
+        self.assertEqual(update_history(history, jobs), 1)
+
+        rec = get_recommendation(history, jobs[0])
+        self.assertEqual(rec, {"njobs": 3, "mem": 3, "walltime": 4.5, "ppn": 2})
+        self.assertEqual(resource_list(jobs[0], rec), "nodes=1:ppn=2,mem=3gb,walltime=04:30:00")
+
+    def test_recommend_walltime(self):
+        # jobs that hardly use any walltime still get a valid walltime request
+        history = new_history()
+        jobs = [finished_job(str(i), mem=1, walltime=0, ncore=1) for i in range(3)]
+        update_history(history, jobs)
+        rec = get_recommendation(history, jobs[0])
+        self.assertEqual(rec["walltime"], 0.25)
+        self.assertEqual(resource_list(jobs[0], rec), "nodes=1:ppn=1,mem=2gb,walltime=00:15:00")
+
+    def test_group_jobname(self):
+        history = new_history()
+        jobs = [finished_job("12[%d]" % i, 1, 1, 1, jobname="a|b-%d" % i) for i in range(3)]
+        update_history(history, jobs)
+        self.assertEqual([group["jobname"] for group in history["groups"].values()], ["a|b"])
+
+    def test_recommend_cores(self):
+        # no margin on cores, and never more cores than requested
+        for nodes, queue, ncore, ppn in [
+            ("1:ppn=1", "single_core", 1.0, 1),
+            ("1:ppn=2", "smp", 1.7, 2),
+            ("1:ppn=2", "smp", 2.0, 2),
+            ("1:ppn=8", "smp", 3.2, 4),
+            ("2:ppn=8", "mpi", 12.5, 7),
+            ("1:ppn=4", "single_core", 3.0, 1),
+        ]:
+            history = new_history()
+            jobs = [finished_job(str(i), 1, 1, ncore, nodes=nodes, queue=queue) for i in range(3)]
+            update_history(history, jobs)
+            self.assertEqual(get_recommendation(history, jobs[0])["ppn"], ppn, nodes)
+
+    def test_replay(self):
+        history = new_history()
+        jobs = [finished_job(str(i), 1, 1, 1) for i in range(1, 2001)]
+        self.assertEqual(update_history(history, jobs), 2000)
+        group = history["groups"][group_key(jobs[0])]
+        self.assertEqual(len(group["jobids"]), HISTORY_SAMPLES)
+        self.assertEqual(len(group["seen"]), HISTORY_SEEN)
+
+        # replaying old snapshots does not add jobs again, nor recalculate the recommendation
+        group["recommend"] = "unchanged"
+        self.assertEqual(update_history(history, jobs[:10]), 0)
+        self.assertEqual(update_history(history, jobs[-10:]), 0)
+        self.assertEqual(group["recommend"], "unchanged")
+
+        # the tasks of large arrays are not added again either
+        array = [finished_job("3000[%d]" % i, 1, 1, 1) for i in range(1, 1502)]
+        self.assertEqual(update_history(history, array[:1500]), 1500)
+        self.assertEqual(update_history(history, array), 1)
+        self.assertNotEqual(group["recommend"], "unchanged")
+        self.assertEqual(update_history(history, [finished_job("2500", 1, 1, 1)]), 0)
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "history.json")
+            history = load_history(filename)
+            update_history(history, [finished_job(str(i), 1, 1, 1) for i in range(5)])
+            save_history(history, filename)
+            self.assertEqual(load_history(filename), history)
+            self.assertEqual(os.listdir(tmpdir), ["history.json"])
+        finally:
+            shutil.rmtree(tmpdir)
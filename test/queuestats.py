@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test queue wait-time and throughput analytics
+"""
+
+import os
+import random
+
+from vsc.install.testing import TestCase
+from vsc.myresources.constants import QUEUE_ACCURACY, RESLIST
+from vsc.myresources.queuestats import (
+    collect_queue_stats,
+    merge_queue_stats,
+    merge_sketch,
+    new_sketch,
+    sketch_add,
+    sketch_quantile,
+    usage_bin_names,
+    wait_time,
+)
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def exact_quantile(values, quantile):
+    """ the value of the sorted values at the same rank as sketch_quantile """
+    return sorted(values)[int(quantile / 100.0 * (len(values) - 1))]
+
+
+class QueueStatsTest(TestCase):
+    def test_sketch(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(6, 2) for _ in range(5000)] + [0] * 100
+        sketch = new_sketch()
+        for value in values:
+            sketch_add(sketch, value)
+        self.assertEqual(sketch["count"], len(values))
+        for quantile in [0, 1, 10, 50, 90, 99, 100]:
+            exact = exact_quantile(values, quantile)
+            estimate = sketch_quantile(sketch, quantile)
+            if exact < 1:
+                self.assertEqual(estimate, 0.0)
+            else:
+                self.assertTrue(abs(estimate - exact) <= QUEUE_ACCURACY * exact * 1.0001, (quantile, estimate, exact))
+        # memory grows with the log of the range of values, not with the number of values
+        self.assertTrue(len(sketch["buckets"]) < 1000)
+        self.assertEqual(sketch_quantile(new_sketch(), 50), None)
+
+    def test_merge_sketch(self):
+        rng = random.Random(1)
+        sketches = [new_sketch(), new_sketch()]
+        total = new_sketch()
+        for _ in range(1000):
+            value = rng.expovariate(1.0 / 3600)
+            sketch_add(rng.choice(sketches), value)
+            sketch_add(total, value)
+        self.assertEqual(merge_sketch(sketches[0], sketches[1]), total)
+        self.assertRaises(ValueError, merge_sketch, new_sketch(0.01), new_sketch(0.05))
+
+    def test_collect(self):
+        jobs = list(iter_jobs(os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")))
+        stats = collect_queue_stats(jobs)
+        self.assertEqual(sorted(stats["queues"]), ["single_core", "smp"])
+        started = [job for job in jobs if wait_time(job) is not None]
+        self.assertEqual(sum(entry["wait"]["count"] for entry in stats["queues"].values()), len(started))
+        self.assertEqual(sum(entry["queued"] for entry in stats["queues"].values()), 31)
+        self.assertEqual(sum(stats["started"].values()), len([job for job in jobs if job["start_time"]]))
+        self.assertEqual(sum(stats["completed"].values()), len([job for job in jobs if job["comp_time"]]))
+        for hour in list(stats["started"]) + list(stats["completed"]):
+            self.assertEqual(hour % 3600, 0)
+        for res in RESLIST:
+            self.assertEqual(len(stats["usage"][res]), len(usage_bin_names()))
+
+        # wait time from eligible to run until started
+        job = dict(jobs[0], qtime=1000, etime=1500, start_time=1600)
+        self.assertEqual(wait_time(job), 100)
+        self.assertEqual(wait_time(dict(job, etime=None)), 600)
+        self.assertEqual(wait_time(dict(job, start_time=None)), None)
+
+    def test_merge(self):
+        jobs = []
+        for i in range(1, 19):
+            jobs.extend(iter_jobs(os.path.join(TEST_DIR, "qstat_xml", "qstat%s.xml" % i)))
+        half = len(jobs) // 2
+        merged = merge_queue_stats(collect_queue_stats(jobs[:half]), collect_queue_stats(jobs[half:]))
+        self.assertEqual(merged, collect_queue_stats(jobs))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test resource registry
+"""
+
+import os
+
+from vsc.install.testing import TestCase
+from vsc.myresources.constants import RESLIST, XML_FIELDS
+from vsc.myresources.resources import RESOURCES, compile_resources, resolve_resources, resources_source
+from vsc.myresources.utils import (
+    RESOURCE_HELPERS,
+    build_job,
+    calc_usage,
+    convert_mem,
+    convert_number,
+    count_gpus,
+    enable_resources,
+    enabled_resources,
+    get_alerts,
+    iter_job_fields,
+    iter_jobs,
+    new_job,
+)
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTRA = ["vmem", "energy", "gpus"]
+
+
+class ResourcesTest(TestCase):
+    def tearDown(self):
+        enable_resources()
+
+    def test_default(self):
+        self.assertEqual(enabled_resources(), RESLIST)
+        job = new_job()
+        self.assertEqual([res for res in RESOURCES if res in job], RESLIST)
+
+    def test_source(self):
+        # the generated functions have no loops or branches over the resources
+        source = resources_source(RESLIST + EXTRA)
+        self.assertFalse(" for " in source)
+        self.assertFalse("res ==" in source)
+        for res in RESLIST + EXTRA:
+            self.assertTrue('job[%r]' % res in source)
+        self.assertRaises(ValueError, compile_resources, ["walltime", "foo"], RESOURCE_HELPERS)
+
+    def test_extra(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobs = list(iter_jobs(xmlfile))
+        default_fields = list(iter_job_fields(xmlfile, engine="fast"))
+        enable_resources(RESLIST + EXTRA)
+        self.assertEqual(enabled_resources(), RESLIST + EXTRA)
+        extra_jobs = list(iter_jobs(xmlfile))
+        fields = list(iter_job_fields(xmlfile))
+        self.assertEqual(len(extra_jobs), len(jobs))
+        # only the xml paths of the enabled resources are extracted
+        self.assertFalse("resources_used/vmem" in default_fields[0])
+        self.assertTrue("resources_used/vmem" in fields[0])
+        for job, extra_job, field in zip(jobs, extra_jobs, fields):
+            # the default resources do not change
+            for res in RESLIST:
+                self.assertEqual(extra_job[res], job[res])
+            if job["state"] in ("R", "E", "C"):
+                self.assertEqual(extra_job["vmem"]["used"], convert_mem(field["resources_used/vmem"]))
+                self.assertEqual(extra_job["energy"]["used"], convert_number(field["resources_used/energy_used"]))
+            else:
+                self.assertEqual(extra_job["vmem"]["used"], None)
+            self.assertEqual(extra_job["gpus"]["avail"], None if job["nodes"] is None else 0)
+            self.assertEqual(extra_job["gpus"]["usage"], None)
+
+    def test_usage(self):
+        enable_resources(RESLIST + ["vmem"])
+        fields = dict.fromkeys(XML_FIELDS)
+        fields.update(
+            {
+                "Job_Id": "1",
+                "job_state": "R",
+                "queue": "smp",
+                "Resource_List/mem": "8gb",
+                "Resource_List/walltime": "10:00:00",
+                "Resource_List/nodes": "1:ppn=4",
+                "resources_used/mem": "2gb",
+                "resources_used/walltime": "05:00:00",
+                "resources_used/cput": "10:00:00",
+                "Resource_List/vmem": "16gb",
+                "resources_used/vmem": "4gb",
+            }
+        )
+        job = calc_usage(build_job(fields))
+        self.assertEqual(job["vmem"]["usage"], 25)
+        self.assertEqual(job["mem"]["usage"], 25)
+        self.assertEqual(job["mem"]["usage_for_free"], 100.0)
+        self.assertEqual(job["ncore"]["used"], 2.0)
+        self.assertEqual(job["ncore"]["usage"], 50)
+        self.assertEqual(job["walltime"]["usage"], 50)
+
+    def test_requires(self):
+        # the resources that the enabled ones require are computed first
+        self.assertEqual(resolve_resources(RESLIST), ["walltime", "ncore", "mem"])
+        self.assertEqual(resolve_resources(["mem", "walltime"]), ["walltime", "ncore", "mem"])
+        self.assertEqual(resolve_resources(["vmem"]), ["vmem"])
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobs = list(iter_jobs(xmlfile))
+        for names in [["ncore", "walltime", "mem"], ["mem", "walltime"], ["ncore"], ["vmem"]]:
+            enable_resources(names)
+            self.assertEqual(enabled_resources(), names)
+            for job, other in zip(jobs, iter_jobs(xmlfile)):
+                for res in [res for res in resolve_resources(names) if res in RESLIST]:
+                    self.assertEqual(other[res], job[res], "%s %s" % (names, res))
+                self.assertEqual(get_alerts(other), [alert for alert in get_alerts(job) if alert in get_alerts(other)])
+
+    def test_levels(self):
+        # the alerts use the levels of the registry
+        job = {"mem": {"usage": 90, "usage_for_free": 0.0, "used": 0.9, "avail": 1.0}, "exit_status": None}
+        self.assertEqual(get_alerts(job), [])
+        levels = RESOURCES["mem"]["levels"]
+        RESOURCES["mem"]["levels"] = (50, 75, 85)
+        try:
+            self.assertEqual(len(get_alerts(job)), 1)
+        finally:
+            RESOURCES["mem"]["levels"] = levels
+
+    def test_swap(self):
+        # jobs that are being read keep the resources they started with
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat17.xml")
+        jobs = iter_jobs(xmlfile)
+        first = next(jobs)
+        enable_resources(["vmem"])
+        self.assertEqual([res for res in RESOURCES if res in next(jobs)], [res for res in RESOURCES if res in first])
+
+    def test_count_gpus(self):
+        self.assertEqual(count_gpus({"nodes": None}), None)
+        self.assertEqual(count_gpus({"nodes": "1:ppn=4"}), 0)
+        self.assertEqual(count_gpus({"nodes": "2:ppn=4:gpus=2"}), 4)
+        self.assertEqual(count_gpus({"nodes": "nic66:ppn=5:gpus=1+1:ppn=5:gpus=2"}), 3)
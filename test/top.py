@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026-2026 Vrije Universiteit Brussel
+#
+# This file is part of myresources,
+# originally created by the HPC team of Vrije Universiteit Brussel (https://hpc.vub.be),
+# with support of Vrije Universiteit Brussel (https://www.vub.be),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# the Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/sisc-hpc/myresources
+#
+# myresources is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# myresources is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with myresources.  If not, see <http://www.gnu.org/licenses/>.
+"""
+test top-K selection of jobs wasting the most resources
+"""
+
+import os
+
+from vsc.install.testing import TestCase
+from vsc.myresources.top import TOP_METRICS, top_jobs
+from vsc.myresources.utils import iter_jobs
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TopTest(TestCase):
+    def test_top_jobs(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat4.xml")
+        jobs = list(iter_jobs(xmlfile))
+        for by, (metric, _) in TOP_METRICS.items():
+            values = sorted([metric(job) for job in jobs if metric(job)], reverse=True)
+            for number in (1, 5, 1000):
+                top = top_jobs(iter_jobs(xmlfile), number, by=by)
+                self.assertEqual([value for value, _ in top], values[:number])
+
+    def test_top_jobs_state(self):
+        xmlfile = os.path.join(TEST_DIR, "qstat_xml", "qstat4.xml")
+        top = top_jobs(iter_jobs(xmlfile, states=["R"]), 10, by="cores")
+        self.assertEqual(len(top), 10)
+        self.assertTrue(all(job["state"] == "R" for _, job in top))
+        self.assertEqual(top_jobs(iter_jobs(xmlfile), 0), [])